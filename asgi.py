@@ -0,0 +1,154 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import inspect
+import os
+from tempfile import SpooledTemporaryFile
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgiInstance
+from flask.signals import request_started
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
+
+from app import app
+
+# Threads for the sync (WSGI) views: auth pages, downloads, SSE streams, JSON endpoints
+ASGI_SYNC_THREADS = int(os.getenv("ASGI_SYNC_THREADS", "32"))
+
+# Request bodies stay in memory up to this size before spilling to disk
+ASGI_BODY_SPOOL_BYTES = 1024 * 1024
+
+_native_dispatch = contextvars.ContextVar("native_dispatch", default=False)
+
+
+class _ThreadedWsgiInstance(WsgiToAsgiInstance):
+    # asgiref runs every WSGI request on one shared thread; spread them over the pool instead
+    run_wsgi_app = sync_to_async(inspect.unwrap(WsgiToAsgiInstance.__dict__["run_wsgi_app"]), thread_sensitive=False)
+
+
+class FlaskASGI:
+    """ASGI application serving the Flask app: `uvicorn asgi:application`.
+
+    Under gunicorn every request holds a worker thread, and Flask gives each async view a
+    fresh event loop on it, so a worker serves at most as many generations at once as it
+    has threads. Here the async views (the AI routes and upload) are awaited directly on
+    the server's event loop, so a request waiting on the model costs a task, not a
+    thread. Everything else runs unchanged as WSGI on a thread pool.
+    """
+
+    def __init__(self, flask_app):
+        self.app = flask_app
+        self.native_endpoints = {endpoint for endpoint, view in flask_app.view_functions.items()
+                                 if inspect.iscoroutinefunction(inspect.unwrap(view))}
+        self._ensure_sync = flask_app.ensure_sync
+        flask_app.ensure_sync = self.ensure_sync
+
+    def ensure_sync(self, func):
+        # On the native path a view's coroutine is handed back to be awaited on the server loop
+        if _native_dispatch.get() and inspect.iscoroutinefunction(func):
+            return func
+        return self._ensure_sync(func)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif self._endpoint(scope) in self.native_endpoints:
+            await self._dispatch(scope, receive, send)
+        else:
+            await _ThreadedWsgiInstance(self.app)(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                asyncio.get_running_loop().set_default_executor(
+                    ThreadPoolExecutor(ASGI_SYNC_THREADS, thread_name_prefix="asgi-sync"))
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _endpoint(self, scope):
+        if scope["type"] != "http":
+            return None
+        adapter = self.app.url_map.bind("localhost", script_name=scope.get("root_path") or None,
+                                        url_scheme=scope.get("scheme", "http"))
+        try:
+            endpoint, _ = adapter.match(scope["path"], method=scope["method"])
+        except HTTPException:
+            # Not found, wrong method, redirects: let Flask produce the response
+            return None
+        return endpoint
+
+    async def _dispatch(self, scope, receive, send):
+        """Flask's wsgi_app, awaiting the view instead of running it through async_to_sync."""
+        with SpooledTemporaryFile(max_size=ASGI_BODY_SPOOL_BYTES) as body:
+            instance = WsgiToAsgiInstance(self.app)
+            instance.scope = scope
+            environ = instance.build_environ(scope, body)
+
+            ctx = self.app.request_context(environ)
+            token = _native_dispatch.set(True)
+            error = None
+            try:
+                try:
+                    ctx.push()
+                    response = await self._full_dispatch_request(receive, body)
+                except Exception as e:
+                    error = e
+                    response = self.app.handle_exception(e)
+                await self._send(response, environ, send)
+            finally:
+                _native_dispatch.reset(token)
+                ctx.pop(error)
+
+    async def _read_body(self, receive, body):
+        limit = self.app.config.get("MAX_CONTENT_LENGTH")
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                # Client went away before sending the whole body
+                raise ConnectionResetError("Client disconnected")
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if limit and size > limit:
+                raise RequestEntityTooLarge()
+            body.write(chunk)
+            if not message.get("more_body"):
+                break
+        body.seek(0)
+
+    async def _full_dispatch_request(self, receive, body):
+        app = self.app
+        app._got_first_request = True
+        try:
+            # Read inside the handler so an oversized body gets the app's 413 response
+            await self._read_body(receive, body)
+            request_started.send(app, _async_wrapper=app.ensure_sync)
+            rv = app.preprocess_request()
+            if rv is None:
+                rv = app.dispatch_request()
+                if inspect.isawaitable(rv):
+                    rv = await rv
+        except Exception as e:
+            rv = app.handle_user_exception(e)
+        return app.finalize_request(rv)
+
+    async def _send(self, response, environ, send):
+        app_iter, status, headers = response.get_wsgi_response(environ)
+        await send({
+            "type": "http.response.start",
+            "status": int(status.split(" ", 1)[0]),
+            "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+        })
+        try:
+            for chunk in app_iter:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        finally:
+            if hasattr(app_iter, "close"):
+                app_iter.close()
+        await send({"type": "http.response.body", "body": b""})
+
+
+application = FlaskASGI(app)
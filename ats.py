@@ -1,67 +1,23 @@
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-import google.generativeai as genai
-from langchain_community.vectorstores import FAISS
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains.question_answering import load_qa_chain
-from langchain.prompts import PromptTemplate
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from dotenv import load_dotenv
-import os
+from ats_score import format_findings, score_resume
+from llm_pipeline import PromptSpec, generate, run, stream
 
-load_dotenv()
+# Everything a recruiter would weigh against a job description; the contact header is left out
+ATS_SECTIONS = ("summary", "experience", "projects", "skills", "education", "certifications", "achievements",
+                "publications", "extracurricular")
 
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-
-FAISS_INDEX_DIR = "faiss_indices"
-
-# Ensure the directory exists
-os.makedirs(FAISS_INDEX_DIR, exist_ok=True)
-
-
-def remove_duplicate_lines(text):
-    lines = text.split("\n")
-    unique_lines = []
-    seen_lines = set()
-    for line in lines:
-        if line.strip() not in seen_lines:
-            unique_lines.append(line.strip())
-            seen_lines.add(line.strip())
-    return "\n".join(unique_lines)
-
-
-async def get_text_chunks(text):
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    return text_splitter.split_text(text)
-
-
-async def create_faiss_index(text_chunks, index_name):
-    if not text_chunks:
-        raise ValueError("The text chunks are empty. Cannot create a vector store.")
-
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-    vector_store = FAISS.from_texts(text_chunks, embedding=embeddings)
-
-    # Save the FAISS index
-    index_path = os.path.join(FAISS_INDEX_DIR, f"{index_name}.faiss")
-    vector_store.save_local(index_path)
-
-    return vector_store
-
-
-async def load_faiss_index(index_name, embeddings):
-    index_path = os.path.join(FAISS_INDEX_DIR, f"{index_name}.faiss")
-    return FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True)
-
-
-async def get_ats_chain(job_description):
-    prompt_template = f"""
+ATS_PROMPT = PromptSpec(
+    name="ats_analysis",
+    template="""
     As a highly sophisticated and insightful Applicant Tracking System (ATS) with extensive expertise across various professional fields, your task is to thoroughly evaluate the given resume based on the following job description:
 
     Job Description:
     {job_description}
 
     Resume:
-    {{context}}
+    {context}
+
+    Keyword Pre-screen (computed deterministically from the resume and job description before this analysis):
+    {ats_findings}
 
     Please ensure to use HTML tags for formatting the response strictly as follows:
     <h2> for main headings
@@ -76,10 +32,10 @@ async def get_ats_chain(job_description):
     Provide a comprehensive, detailed analysis of the resume, addressing the candidate directly in the first person throughout your evaluation. Your analysis should include the following sections:
 
     <h2><b>1. Overall Match Assessment</b></h2>
-    <p>Calculate and present an overall match percentage between the resume and the job description. Explain the key factors contributing to this percentage.</p><br>
+    <p>Present the pre-screen match score as the overall match percentage; do not calculate a different one. Explain the key factors contributing to this percentage.</p><br>
 
     <h2><b>2. Skills Gap Analysis</b></h2>
-    <p>Create a detailed list of key skills or qualifications mentioned in the job description that are missing from the resume. For each missing skill:</p>
+    <p>Starting from the missing skills and keywords found by the pre-screen, create a detailed list of key skills or qualifications mentioned in the job description that are missing from the resume. For each missing skill:</p>
     <ul>
     <li>Explain its importance to the role</li>
     <li>Suggest how the candidate might acquire or demonstrate this skill</li>
@@ -125,28 +81,35 @@ async def get_ats_chain(job_description):
 
     End the analysis on a new line, using a creative or witty closing phrase.
 
-    """
+    """,
+    input_variables=("job_description", "ats_findings"),
+    temperature=0.7,
+    version="3",
+    query_variable="job_description",
+    sections=ATS_SECTIONS,
+    dedupe_lines=True,
+    empty_message="Error: The resume is empty or could not be processed. Did you accidentally submit a blank page? "
+                  "Even our AI needs something to work with!",
+)
+
+
+def _findings(resume_text, job_description, structured, score):
+    return format_findings(score or score_resume(resume_text, job_description, structured))
+
 
-    model = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.7)
-    prompt = PromptTemplate(template=prompt_template, input_variables=["job_description", "context"])
-    return load_qa_chain(model, chain_type="stuff", prompt=prompt)
+async def generate_ats_analysis(resume_text, job_description, resume_id=None, structured=None, score=None):
+    """Narrative ATS analysis built on the local pre-score (computed here unless `score` is passed)."""
+    return await generate(ATS_PROMPT, resume_text, resume_id, structured=structured, job_description=job_description,
+                          ats_findings=_findings(resume_text, job_description, structured, score))
 
 
-async def generate_ats_analysis(resume_text, job_description):
-    text_chunks = await get_text_chunks(resume_text)
-    if not text_chunks:
-        return "Error: The resume is empty or could not be processed. Did you accidentally submit a blank page? Even " \
-               "our AI needs something to work with!"
+def run_ats_analysis(resume_text, job_description, resume_id=None, structured=None, score=None):
+    """Blocking variant of generate_ats_analysis for worker threads."""
+    return run(ATS_PROMPT, resume_text, resume_id, structured=structured, job_description=job_description,
+               ats_findings=_findings(resume_text, job_description, structured, score))
 
-    try:
-        # Create and save the FAISS index
-        vector_store = await create_faiss_index(text_chunks, "ats_index")
-    except ValueError as e:
-        return f"Oops! {str(e)} It seems your resume is playing hide and seek, and winning."
 
-    docs = vector_store.similarity_search(resume_text)
-    chain = await get_ats_chain(job_description)
-    response = chain.invoke({"input_documents": docs, "job_description": job_description, "context": resume_text})
-    ats_response = response["output_text"]
-    ats_response = remove_duplicate_lines(ats_response)
-    return ats_response
+def stream_ats_analysis(resume_text, job_description, resume_id=None, structured=None, score=None):
+    """Yield the ATS analysis incrementally, de-duplicating lines as generate_ats_analysis does."""
+    return stream(ATS_PROMPT, resume_text, resume_id, structured=structured, job_description=job_description,
+                  ats_findings=_findings(resume_text, job_description, structured, score))
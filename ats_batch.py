@@ -0,0 +1,149 @@
+from concurrent.futures import ThreadPoolExecutor
+import math
+import os
+
+import numpy as np
+from dotenv import load_dotenv
+
+from ats import run_ats_analysis
+from ats_score import TextProfile, resume_profile, SKILL_WEIGHT, BM25_B, BM25_K1, AVERAGE_RESUME_TOKENS
+from embedding_cache import get_embeddings
+
+load_dotenv()
+
+ATS_BATCH_MAX_RESUMES = int(os.getenv("ATS_BATCH_MAX_RESUMES", "50"))
+ATS_BATCH_MAX_JOBS = int(os.getenv("ATS_BATCH_MAX_JOBS", "50"))
+# Narratives generated at once, and at most per batch (best matches first)
+ATS_BATCH_CONCURRENCY = int(os.getenv("ATS_BATCH_CONCURRENCY", "4"))
+ATS_BATCH_MAX_NARRATIVES = int(os.getenv("ATS_BATCH_MAX_NARRATIVES", "10"))
+
+# Roughly the embedding model's input limit
+EMBEDDING_MAX_CHARS = 8000
+
+
+def _weights(counts):
+    return {key: 1 + math.log(count) for key, count in counts}
+
+
+def score_matrix(resumes, jobs):
+    """Score every resume TextProfile against every job TextProfile at once.
+
+    Returns (score, skill_score, keyword_score) as (jobs x resumes) arrays of 0-100
+    values equal to what score_profiles gives pair by pair, with NaN where a job
+    description has no skills or keywords. Skill coverage and BM25 keyword coverage
+    are each one weighted matrix product over a shared skill / term index.
+    """
+    skills = sorted({skill for job in jobs for skill in job.skills})
+    terms = sorted({term for job in jobs for term, _ in job.keywords()})
+    skill_index = {skill: i for i, skill in enumerate(skills)}
+    term_index = {term: i for i, term in enumerate(terms)}
+
+    skill_weights = np.zeros((len(jobs), len(skills)))
+    term_weights = np.zeros((len(jobs), len(terms)))
+    for row, job in enumerate(jobs):
+        for skill, weight in _weights(job.skills.items()).items():
+            skill_weights[row, skill_index[skill]] = weight
+        for term, weight in _weights(job.keywords()).items():
+            term_weights[row, term_index[term]] = weight
+
+    has_skill = np.array([[skill in resume.skills for skill in skills] for resume in resumes], dtype=float)
+    tf = np.array([[resume.terms.get(term, 0) for term in terms] for resume in resumes], dtype=float)
+    lengths = np.array([resume.length for resume in resumes], dtype=float)[:, None]
+    length_norm = 1 - BM25_B + BM25_B * lengths / AVERAGE_RESUME_TOKENS
+    saturation = tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm) / (BM25_K1 + 1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        skill_score = skill_weights @ has_skill.reshape(len(resumes), len(skills)).T / skill_weights.sum(1)[:, None]
+        keyword_score = term_weights @ saturation.reshape(len(resumes), len(terms)).T / term_weights.sum(1)[:, None]
+
+    no_skills, no_terms = np.isnan(skill_score), np.isnan(keyword_score)
+    score = SKILL_WEIGHT * skill_score + (1 - SKILL_WEIGHT) * keyword_score
+    score = np.where(no_skills, keyword_score, np.where(no_terms, skill_score, score))
+    return np.rint(100 * np.nan_to_num(score)), np.rint(100 * skill_score), np.rint(100 * keyword_score)
+
+
+def similarity_matrix(resume_texts, job_texts):
+    """Cosine similarity of job and resume embeddings, embedding each distinct text once (and only if uncached)."""
+    texts = list(dict.fromkeys(text[:EMBEDDING_MAX_CHARS] for text in resume_texts + job_texts))
+    vectors = np.array(get_embeddings().embed_documents(texts))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = {text: i for i, text in enumerate(texts)}
+    resume_vectors = vectors[[index[text[:EMBEDDING_MAX_CHARS]] for text in resume_texts]]
+    job_vectors = vectors[[index[text[:EMBEDDING_MAX_CHARS]] for text in job_texts]]
+    return job_vectors @ resume_vectors.T
+
+
+def _title(job_description):
+    line = next((line.strip() for line in job_description.splitlines() if line.strip()), "")
+    return line if len(line) <= 80 else line[:77] + "..."
+
+
+def rank_batch(resumes, job_descriptions, narratives=0, similarity=True, admit=None):
+    """Rank every (resume, job description) pair, best match first.
+
+    `resumes` are Resume rows. Each distinct job description is profiled and
+    embedded once; scores come from score_matrix. The best `narratives` pairs also
+    get a full ATS analysis, generated ATS_BATCH_CONCURRENCY at a time. `admit(count)`
+    is called before generating them and returns the leases they may run on at once
+    (see GenerationLimiter.acquire_batch_nowait).
+    """
+    # Repeated job descriptions are scored once and reported under their first position
+    positions = {}
+    for i, job_description in enumerate(job_descriptions):
+        positions.setdefault(job_description, i)
+    job_descriptions = list(positions)
+    resume_profiles = [resume_profile(resume.extracted_text, resume.structured) for resume in resumes]
+    job_profiles = [TextProfile(job_description) for job_description in job_descriptions]
+
+    scores, skill_scores, keyword_scores = score_matrix(resume_profiles, job_profiles)
+    similarities = None
+    if similarity:
+        try:
+            similarities = similarity_matrix([resume.extracted_text or "" for resume in resumes], job_descriptions)
+        except Exception as e:
+            # Similarity only breaks ties; the keyword ranking stands on its own
+            print(f"Skipping embedding similarity for ATS batch: {str(e)}")
+
+    rows = []
+    for j, job_description in enumerate(job_descriptions):
+        job = job_profiles[j]
+        job_skills = sorted(job.skills, key=lambda skill: job.skills[skill], reverse=True)
+        job_terms = [term for term, _ in job.keywords()]
+        for r, resume in enumerate(resumes):
+            profile = resume_profiles[r]
+            rows.append({
+                "resume_id": resume.id,
+                "candidate_name": resume.candidate_name,
+                "job_index": positions[job_description],
+                "job_title": _title(job_description),
+                "score": int(scores[j, r]),
+                "similarity": None if similarities is None else round(float(similarities[j, r]), 4),
+                "skill_score": None if np.isnan(skill_scores[j, r]) else int(skill_scores[j, r]),
+                "keyword_score": None if np.isnan(keyword_scores[j, r]) else int(keyword_scores[j, r]),
+                "matched_skills": [skill for skill in job_skills if skill in profile.skills],
+                "missing_skills": [skill for skill in job_skills if skill not in profile.skills],
+                "missing_keywords": [job.surface[term] for term in job_terms if term not in profile.terms],
+            })
+
+    rows.sort(key=lambda row: (row["score"], row["similarity"] or 0), reverse=True)
+
+    selected = rows[:min(narratives, ATS_BATCH_MAX_NARRATIVES)]
+    if selected:
+        leases = admit(len(selected)) if admit else ()
+        by_id = {resume.id: resume for resume in resumes}
+        by_position = {i: job_description for job_description, i in positions.items()}
+        try:
+            with ThreadPoolExecutor(max_workers=min(ATS_BATCH_CONCURRENCY, len(leases) or len(selected))) as pool:
+                futures = [pool.submit(run_ats_analysis, by_id[row["resume_id"]].extracted_text,
+                                       by_position[row["job_index"]], row["resume_id"],
+                                       by_id[row["resume_id"]].structured, row)
+                           for row in selected]
+                for row, future in zip(selected, futures):
+                    row["narrative"] = future.result()
+        finally:
+            for lease in leases:
+                lease.release()
+
+    for rank, row in enumerate(rows, 1):
+        row["rank"] = rank
+    return rows
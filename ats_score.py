@@ -0,0 +1,304 @@
+from collections import Counter
+import math
+import re
+
+from text_extraction import fold_to_ascii
+
+# Canonical skill -> the ways resumes and job descriptions spell it (lower case)
+SKILLS_VOCABULARY = {
+    # Languages
+    "Python": ("python", "python3"),
+    "Java": ("java",),
+    "JavaScript": ("javascript", "js", "ecmascript", "es6"),
+    "TypeScript": ("typescript", "ts"),
+    "C": ("c",),
+    "C++": ("c++", "cpp"),
+    "C#": ("c#", "csharp", "c sharp"),
+    "Go": ("go", "golang"),
+    "Rust": ("rust",),
+    "Ruby": ("ruby",),
+    "PHP": ("php",),
+    "Kotlin": ("kotlin",),
+    "Swift": ("swift",),
+    "Scala": ("scala",),
+    "R": ("r",),
+    "MATLAB": ("matlab",),
+    "SQL": ("sql",),
+    "Bash": ("bash", "shell scripting", "shell"),
+    "HTML": ("html", "html5"),
+    "CSS": ("css", "css3"),
+    "Dart": ("dart",),
+    # Web and backend frameworks
+    "React": ("react", "react.js", "reactjs"),
+    "Angular": ("angular", "angularjs", "angular.js"),
+    "Vue.js": ("vue", "vue.js", "vuejs"),
+    "Next.js": ("next.js", "nextjs"),
+    "Node.js": ("node.js", "nodejs", "node"),
+    "Express": ("express", "express.js", "expressjs"),
+    "Django": ("django",),
+    "Flask": ("flask",),
+    "FastAPI": ("fastapi",),
+    "Spring": ("spring", "spring boot", "springboot"),
+    "Ruby on Rails": ("rails", "ruby on rails"),
+    ".NET": (".net", "dotnet", "asp.net"),
+    "Tailwind CSS": ("tailwind", "tailwindcss", "tailwind css"),
+    "Bootstrap": ("bootstrap",),
+    "jQuery": ("jquery",),
+    "Redux": ("redux",),
+    "GraphQL": ("graphql",),
+    "REST APIs": ("rest", "restful", "rest api", "rest apis", "restful apis"),
+    "gRPC": ("grpc",),
+    "Microservices": ("microservices", "microservice", "micro services"),
+    "Flutter": ("flutter",),
+    "React Native": ("react native",),
+    "Android": ("android",),
+    "iOS": ("ios",),
+    # Data stores
+    "PostgreSQL": ("postgresql", "postgres"),
+    "MySQL": ("mysql",),
+    "SQLite": ("sqlite",),
+    "MongoDB": ("mongodb", "mongo"),
+    "Redis": ("redis",),
+    "Elasticsearch": ("elasticsearch", "elastic search", "opensearch"),
+    "Cassandra": ("cassandra",),
+    "DynamoDB": ("dynamodb",),
+    "Oracle": ("oracle",),
+    "Snowflake": ("snowflake",),
+    "BigQuery": ("bigquery", "big query"),
+    "Kafka": ("kafka", "apache kafka"),
+    "RabbitMQ": ("rabbitmq",),
+    # Cloud and infrastructure
+    "AWS": ("aws", "amazon web services"),
+    "Azure": ("azure", "microsoft azure"),
+    "GCP": ("gcp", "google cloud", "google cloud platform"),
+    "Docker": ("docker", "containers", "containerization"),
+    "Kubernetes": ("kubernetes", "k8s"),
+    "Terraform": ("terraform",),
+    "Ansible": ("ansible",),
+    "Linux": ("linux", "unix"),
+    "Git": ("git", "github", "gitlab", "bitbucket"),
+    "CI/CD": ("ci/cd", "ci", "cd", "continuous integration", "continuous delivery", "continuous deployment"),
+    "Jenkins": ("jenkins",),
+    "GitHub Actions": ("github actions",),
+    "Nginx": ("nginx",),
+    "Serverless": ("serverless", "lambda", "aws lambda"),
+    "Prometheus": ("prometheus",),
+    "Grafana": ("grafana",),
+    # Data, ML and AI
+    "Machine Learning": ("machine learning", "ml"),
+    "Deep Learning": ("deep learning",),
+    "NLP": ("nlp", "natural language processing"),
+    "Computer Vision": ("computer vision", "opencv"),
+    "LLMs": ("llm", "llms", "large language models", "generative ai", "genai"),
+    "TensorFlow": ("tensorflow",),
+    "PyTorch": ("pytorch", "torch"),
+    "scikit-learn": ("scikit-learn", "sklearn", "scikit learn"),
+    "Keras": ("keras",),
+    "Pandas": ("pandas",),
+    "NumPy": ("numpy",),
+    "Spark": ("spark", "pyspark", "apache spark"),
+    "Hadoop": ("hadoop",),
+    "Airflow": ("airflow", "apache airflow"),
+    "dbt": ("dbt",),
+    "ETL": ("etl", "elt", "data pipelines", "data pipeline"),
+    "Data Analysis": ("data analysis", "data analytics", "analytics"),
+    "Data Visualization": ("data visualization", "data visualisation"),
+    "Statistics": ("statistics", "statistical analysis"),
+    "Tableau": ("tableau",),
+    "Power BI": ("power bi", "powerbi"),
+    "Excel": ("excel", "microsoft excel", "ms excel"),
+    "LangChain": ("langchain",),
+    # Practices and testing
+    "Agile": ("agile", "scrum", "kanban"),
+    "TDD": ("tdd", "test driven development", "test-driven development"),
+    "Unit Testing": ("unit testing", "unit tests", "pytest", "junit", "jest"),
+    "System Design": ("system design", "distributed systems", "scalability"),
+    "Data Structures": ("data structures", "algorithms", "data structures and algorithms", "dsa"),
+    "OOP": ("oop", "object oriented programming", "object-oriented programming", "object oriented design"),
+    "Security": ("security", "cybersecurity", "cyber security", "application security"),
+    "Networking": ("networking", "tcp/ip", "tcp", "dns"),
+    "Figma": ("figma",),
+    "UI/UX": ("ui/ux", "ux", "ui design", "user experience"),
+    "SEO": ("seo", "search engine optimization"),
+    "Jira": ("jira",),
+    # Soft skills
+    "Communication": ("communication", "communication skills"),
+    "Leadership": ("leadership", "team leadership", "mentoring", "mentorship"),
+    "Project Management": ("project management",),
+    "Problem Solving": ("problem solving", "problem-solving"),
+    "Collaboration": ("collaboration", "teamwork", "cross-functional"),
+    "Stakeholder Management": ("stakeholder management", "stakeholders"),
+}
+
+# One-letter and common-word spellings only count when capitalised, as names are
+_CASE_SENSITIVE = frozenset(("c", "r", "go", "rest", "swift", "spring", "express", "ci", "cd", "shell", "node", "ts",
+                             "oracle", "security", "analytics", "rust", "dart", "excel", "torch", "lambda"))
+
+_STOPWORDS = frozenset("""
+a about above across after all also an and any are as at be been being best both but by can could do does
+doing each etc every for from good great has have having help how if in including into is it its join just
+like looking make may more most must new not of on one or other our out over own per plus preferred
+required requirements responsibilities role should so some strong such than that the their them then there
+these they this those through to under up us using via want we well what when where which while who will
+with within work working would year years you your ability able candidate candidates company experience
+experienced excellent environment knowledge skills skill team teams understanding opportunity position
+qualifications job apply day days based building build high key level minimum related relevant equivalent
+ideal nice bonus familiarity familiar beyond ensure
+""".split())
+
+_TOKEN = re.compile(r"[A-Za-z0-9][A-Za-z0-9+#]*(?:[./-][A-Za-z0-9+#]+)*")
+
+# BM25 term-frequency saturation and length normalisation
+BM25_K1 = 1.2
+BM25_B = 0.75
+AVERAGE_RESUME_TOKENS = 450
+
+# Job description terms scored, besides skills; and how much skills weigh in the overall score
+KEYWORD_LIMIT = 30
+SKILL_WEIGHT = 0.65
+
+
+def _phrase_table():
+    table = {}
+    for skill, spellings in SKILLS_VOCABULARY.items():
+        for spelling in spellings:
+            table[tuple(token.lower() for token in _TOKEN.findall(spelling))] = skill
+    return table
+
+
+_PHRASES = _phrase_table()
+_MAX_PHRASE = max(len(phrase) for phrase in _PHRASES)
+
+
+def tokenize(text):
+    """Return (lower-case, original) token pairs of ASCII-folded text."""
+    return [(token.lower(), token) for token in _TOKEN.findall(fold_to_ascii(text or ""))]
+
+
+def _stem(token):
+    # Light suffix stripping so "deploying" meets "deployed" and "deploys"
+    if len(token) > 5 and token.endswith("ies"):
+        return token[:-3] + "y"
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(token) > len(suffix) + 3 and token.endswith(suffix) and not token.endswith("ss"):
+            return token[:-len(suffix)]
+    return token
+
+
+def _match_skills(tokens):
+    """Count vocabulary skills in tokens, longest phrase first; also return the tokens no skill used."""
+    found = Counter()
+    rest = []
+    i = 0
+    while i < len(tokens):
+        for size in range(min(_MAX_PHRASE, len(tokens) - i), 0, -1):
+            phrase = tuple(lower for lower, _ in tokens[i:i + size])
+            skill = _PHRASES.get(phrase)
+            if skill is None:
+                continue
+            if size == 1 and phrase[0] in _CASE_SENSITIVE and not tokens[i][1][0].isupper():
+                continue
+            found[skill] += 1
+            i += size
+            break
+        else:
+            rest.append(tokens[i][0])
+            i += 1
+    return found, rest
+
+
+def extract_skills(text):
+    """Count the vocabulary skills mentioned in text."""
+    return _match_skills(tokenize(text))[0]
+
+
+class TextProfile:
+    """The skills and keyword counts of one resume or job description, computed once per text."""
+
+    def __init__(self, text, extra_skills=()):
+        tokens = tokenize(text)
+        self.length = len(tokens)
+        self.skills, rest = _match_skills(tokens)
+        for skill in extra_skills:
+            self.skills.update(extract_skills(skill))
+
+        self.terms = Counter()
+        self.surface = {}
+        for word in rest:
+            if word in _STOPWORDS or word.isdigit() or len(word) <= 2:
+                continue
+            term = _stem(word)
+            self.terms[term] += 1
+            self.surface.setdefault(term, word)
+
+    def keywords(self, limit=KEYWORD_LIMIT):
+        """The non-skill terms this text stresses most, as (term, count) pairs."""
+        return self.terms.most_common(limit)
+
+
+def resume_profile(resume_text, structured=None):
+    # Skills listed in the parsed skills section count even if the flattened text mangled them
+    return TextProfile(resume_text, (structured or {}).get("skills", ()))
+
+
+def _bm25(tf, length):
+    length_norm = 1 - BM25_B + BM25_B * length / AVERAGE_RESUME_TOKENS
+    return tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm) / (BM25_K1 + 1)
+
+
+def score_profiles(resume, job):
+    """Score a resume TextProfile against a job description TextProfile; see score_resume."""
+    skill_weights = {skill: 1 + math.log(count) for skill, count in job.skills.items()}
+    skill_total = sum(skill_weights.values())
+    skill_score = (sum(weight for skill, weight in skill_weights.items() if skill in resume.skills) / skill_total
+                   if skill_total else None)
+
+    job_terms = job.keywords()
+    keyword_total = sum(1 + math.log(count) for _, count in job_terms)
+    keyword_hit = sum((1 + math.log(count)) * _bm25(resume.terms.get(term, 0), resume.length)
+                      for term, count in job_terms)
+    keyword_score = keyword_hit / keyword_total if keyword_total else None
+
+    if skill_score is None and keyword_score is None:
+        score = 0.0
+    elif skill_score is None or keyword_score is None:
+        score = skill_score if keyword_score is None else keyword_score
+    else:
+        score = SKILL_WEIGHT * skill_score + (1 - SKILL_WEIGHT) * keyword_score
+
+    ranked_skills = sorted(skill_weights, key=skill_weights.get, reverse=True)
+    return {
+        "score": round(100 * score),
+        "skill_score": None if skill_score is None else round(100 * skill_score),
+        "keyword_score": None if keyword_score is None else round(100 * keyword_score),
+        "matched_skills": [skill for skill in ranked_skills if skill in resume.skills],
+        "missing_skills": [skill for skill in ranked_skills if skill not in resume.skills],
+        "missing_keywords": [job.surface[term] for term, _ in job_terms if term not in resume.terms],
+    }
+
+
+def score_resume(resume_text, job_description, structured=None):
+    """Score how well a resume covers a job description, without calling a model.
+
+    Skills are matched through SKILLS_VOCABULARY synonyms and weighted by how often
+    the job description mentions them; the job description's other most frequent
+    terms are scored with BM25-style term-frequency saturation against the resume.
+    Returns a JSON-able dict with the 0-100 `score`, its components and the matched
+    and missing terms.
+    """
+    return score_profiles(resume_profile(resume_text, structured), TextProfile(job_description))
+
+
+def format_findings(result):
+    """Render a score_resume result as plain text for the ATS prompt."""
+    def listed(items):
+        return ", ".join(items) if items else "none"
+
+    parts = [f"Match score: {result['score']}%"]
+    if result["skill_score"] is not None:
+        parts[0] += f" (skills {result['skill_score']}%"
+        parts[0] += f", keywords {result['keyword_score']}%)" if result["keyword_score"] is not None else ")"
+    parts.append(f"Matched skills: {listed(result['matched_skills'])}")
+    parts.append(f"Missing skills: {listed(result['missing_skills'])}")
+    parts.append(f"Missing keywords: {listed(result['missing_keywords'])}")
+    return "\n".join(parts)
@@ -0,0 +1,156 @@
+"""Load benchmark of the AI routes under gunicorn (WSGI) and uvicorn (ASGI).
+
+Both servers run one worker process against a stub model server that answers after
+`--latency` seconds, so it runs offline and measures only the serving stack. Each
+route is driven by `--concurrency` clients until `--requests` requests complete;
+generations bypass the response cache so every request waits on the model.
+
+Usage:
+    python benchmarks/bench_asgi.py [--concurrency 64] [--requests 640] [--latency 0.5] [--threads 8]
+
+`--threads` is the gunicorn worker's thread count, i.e. the most generations the
+WSGI worker can have in flight at once.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import aiohttp
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start(command, workdir, env):
+    return subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_until_up(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(url, allow_redirects=False):
+                    return
+            except aiohttp.ClientError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def drive(base_url, route, make_request, concurrency, total):
+    """Run `total` requests with `concurrency` in flight; return (requests/sec, p50, p99, errors)."""
+    jar = aiohttp.CookieJar(unsafe=True)
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=300)
+    async with aiohttp.ClientSession(base_url, cookie_jar=jar, connector=connector, timeout=timeout) as session:
+        async with session.post("/login", data={"email": BENCH_EMAIL, "password": BENCH_PASSWORD},
+                                allow_redirects=False):
+            pass
+
+        latencies, errors = [], 0
+        counter = iter(range(total))
+        # Unique per run so one server's responses are never cache hits for the next
+        run_id = uuid.uuid4().hex[:8]
+
+        async def client():
+            nonlocal errors
+            for number in counter:
+                started = time.perf_counter()
+                try:
+                    async with make_request(session, f"{run_id}-{number}") as response:
+                        await response.read()
+                        if response.status != 200:
+                            errors += 1
+                except aiohttp.ClientError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[client() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    return total / elapsed, percentile(latencies, 0.5), percentile(latencies, 0.99), errors
+
+
+def routes(resume_id):
+    return {
+        "POST /roast/<id> (regenerate)": lambda session, tag: session.post(
+            f"/roast/{resume_id}", data={"action": "regenerate"}, allow_redirects=False),
+        "POST /ats_analysis/narrative": lambda session, tag: session.post(
+            "/ats_analysis/narrative", allow_redirects=False,
+            data={"resume_id": resume_id, "job_description": f"Backend engineer {tag}: Python, Kubernetes, AWS"}),
+    }
+
+
+async def run(args):
+    workdir = tempfile.mkdtemp(prefix="bench_asgi_")
+    stub_port, wsgi_port, asgi_port = free_port(), free_port(), free_port()
+    env = dict(os.environ,
+               PYTHONPATH=os.pathsep.join([BENCH_DIR, ROOT]),
+               STUB_LLM_URL=f"http://127.0.0.1:{stub_port}/generate",
+               DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+               GOOGLE_API_KEY=os.getenv("GOOGLE_API_KEY", "offline"),
+               # One user sends every request; measure serving, not the per-user limits
+               RATE_LIMIT_USER_PER_MINUTE="0", RATE_LIMIT_GLOBAL_PER_MINUTE="0", RATE_LIMIT_USER_CONCURRENCY="0")
+
+    seed = f"import stub_app; stub_app.seed({BENCH_EMAIL!r}, {BENCH_PASSWORD!r})"
+    resume_id = subprocess.check_output([sys.executable, "-c", seed], cwd=workdir, env=env, text=True).split()[-1]
+
+    servers = {
+        f"WSGI (gunicorn gthread, {args.threads} threads)": [
+            sys.executable, "-m", "gunicorn", "-w", "1", "-k", "gthread", "--threads", str(args.threads),
+            "-b", f"127.0.0.1:{wsgi_port}", "--backlog", "4096", "stub_app:app"],
+        "ASGI (uvicorn)": [
+            sys.executable, "-m", "uvicorn", "--port", str(asgi_port), "--backlog", "4096",
+            "--log-level", "warning", "stub_app:application"],
+    }
+    ports = dict(zip(servers, (wsgi_port, asgi_port)))
+
+    processes = [start([sys.executable, os.path.join(BENCH_DIR, "stub_llm.py"), "--port", str(stub_port),
+                        "--latency", str(args.latency)], workdir, env)]
+    try:
+        processes += [start(command, workdir, env) for command in servers.values()]
+        for port in ports.values():
+            await wait_until_up(f"http://127.0.0.1:{port}/login")
+
+        print(f"{args.requests} requests, {args.concurrency} concurrent, {args.latency * 1000:.0f} ms model latency")
+        print(f"{'server':<38} {'route':<32} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for route, make_request in routes(resume_id).items():
+            for server, port in ports.items():
+                rps, p50, p99, errors = await drive(f"http://127.0.0.1:{port}", route, make_request,
+                                                    args.concurrency, args.requests)
+                print(f"{server:<38} {route:<32} {rps:>8.1f} {p50 * 1000:>8.0f} {p99 * 1000:>8.0f} {errors:>7}")
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=640)
+    parser.add_argument("--latency", type=float, default=0.5, help="stub model latency in seconds")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker")
+    asyncio.run(run(parser.parse_args()))
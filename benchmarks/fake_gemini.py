@@ -0,0 +1,157 @@
+"""Deterministic local stand-ins for the Gemini chat and embedding clients.
+
+`install(config)` swaps them in for ChatGoogleGenerativeAI and
+GoogleGenerativeAIEmbeddings, so every chain, middleware and cache in the app runs
+unchanged while no request leaves the machine. Responses depend only on the prompt,
+and failures are drawn from a seeded generator, so two runs with the same
+configuration do the same work.
+"""
+import asyncio
+from dataclasses import dataclass
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+
+from google.api_core.exceptions import ServiceUnavailable
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import embedding_cache  # noqa: E402
+import llm_pipeline  # noqa: E402
+
+# Gemini's embedding-001 dimension
+EMBEDDING_SIZE = 768
+
+_WORDS = ("resume", "experience", "impact", "skills", "project", "team", "delivered", "quantify", "results",
+          "python", "cloud", "leadership", "metrics", "clarity", "achievement", "role", "growth", "design")
+
+
+@dataclass
+class FakeGeminiConfig:
+    latency: float = 0.3  # seconds before the first token
+    token_rate: float = 200.0  # completion tokens per second after that; 0 for instant
+    completion_tokens: int = 400
+    embed_latency: float = 0.05  # seconds per embedding request
+    failure_rate: float = 0.0  # fraction of model calls that raise ServiceUnavailable
+    seed: int = 0
+
+
+_config = FakeGeminiConfig()
+_failures = random.Random(0)
+_failures_lock = threading.Lock()
+
+
+def _should_fail():
+    with _failures_lock:
+        return _failures.random() < _config.failure_rate
+
+
+def estimate_tokens(text):
+    # Gemini averages about four characters per token on English text
+    return len(text) // 4 + 1
+
+
+def fake_completion(prompt, tokens):
+    """About `tokens` tokens of text seeded by the prompt, in lines of twelve words."""
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+    words, length = [], 0
+    while length < tokens * 4:
+        words.append(rng.choice(_WORDS))
+        length += len(words[-1]) + 1
+    return "\n".join(" ".join(words[i:i + 12]) for i in range(0, len(words), 12))
+
+
+def _usage(prompt, text):
+    input_tokens, output_tokens = estimate_tokens(prompt), estimate_tokens(text)
+    return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+
+class FakeGeminiChat(BaseChatModel):
+    """Accepts ChatGoogleGenerativeAI's constructor arguments and ignores the model settings."""
+
+    model: str = "fake-gemini"
+    temperature: float = 0.7
+
+    @property
+    def _llm_type(self):
+        return "fake-gemini"
+
+    def _prepare(self, messages):
+        if _should_fail():
+            raise ServiceUnavailable("Injected failure from the fake Gemini backend")
+        prompt = "\n".join(str(message.content) for message in messages)
+        return prompt, fake_completion(prompt, _config.completion_tokens)
+
+    def _generation_time(self, text):
+        tokens = estimate_tokens(text)
+        return _config.latency + (tokens / _config.token_rate if _config.token_rate else 0)
+
+    def _pieces(self, text):
+        lines = text.split("\n")
+        return [line + ("\n" if i < len(lines) - 1 else "") for i, line in enumerate(lines)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt, text = self._prepare(messages)
+        time.sleep(self._generation_time(text))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text,
+                                                                        usage_metadata=_usage(prompt, text)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt, text = self._prepare(messages)
+        await asyncio.sleep(self._generation_time(text))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text,
+                                                                        usage_metadata=_usage(prompt, text)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt, text = self._prepare(messages)
+        time.sleep(_config.latency)
+        pieces = self._pieces(text)
+        for i, piece in enumerate(pieces):
+            if _config.token_rate:
+                time.sleep(estimate_tokens(piece) / _config.token_rate)
+            usage = _usage(prompt, text) if i == len(pieces) - 1 else None
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece, usage_metadata=usage))
+
+
+class FakeGeminiEmbeddings(Embeddings):
+    """Unit vectors derived from a hash of the text, so equal texts embed identically."""
+
+    def __init__(self, model=None, **kwargs):
+        self.model = model
+
+    def _vector(self, text):
+        rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+        vector = [rng.gauss(0, 1) for _ in range(EMBEDDING_SIZE)]
+        norm = sum(value * value for value in vector) ** 0.5
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts):
+        time.sleep(_config.embed_latency)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        time.sleep(_config.embed_latency)
+        return self._vector(text)
+
+
+def install(config=None):
+    """Use the fake backend for every model and embedding client created from now on."""
+    global _config, _failures
+    _config = config or FakeGeminiConfig()
+    _failures = random.Random(_config.seed)
+    llm_pipeline.ChatGoogleGenerativeAI = FakeGeminiChat
+    embedding_cache.GoogleGenerativeAIEmbeddings = FakeGeminiEmbeddings
+    with llm_pipeline._lock:
+        llm_pipeline._models.clear()
+        llm_pipeline._chains.clear()
+        llm_pipeline._async_models.clear()
+        llm_pipeline._async_chains.clear()
+    with embedding_cache._lock:
+        embedding_cache._embeddings.clear()
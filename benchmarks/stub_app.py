@@ -0,0 +1,52 @@
+"""The app wired to the stub model, for the serving benchmark.
+
+    gunicorn stub_app:app            (WSGI)
+    uvicorn stub_app:application     (ASGI)
+
+Run with benchmarks/ and the repository root on PYTHONPATH, STUB_LLM_URL set and
+DATABASE_URL pointing at a scratch database; bench_asgi.py does all of this.
+"""
+import json
+import os
+
+from stub_llm import install
+
+install(os.environ["STUB_LLM_URL"])
+
+from app import app, db, Resume, User  # noqa: E402
+from asgi import application  # noqa: E402,F401
+from text_extraction import parse_sections  # noqa: E402
+
+app.config["WTF_CSRF_ENABLED"] = False
+
+BENCH_RESUME = """Jane Bench
+jane@example.com | +1 555 010 0000
+
+Summary
+Backend engineer with seven years of experience building Python services.
+
+Experience
+Senior Engineer, Example Corp, 2019 - Present
+Built Flask and Kubernetes services handling 12k requests per second.
+
+Projects
+Resume parser using spaCy, FastAPI and PostgreSQL.
+
+Skills
+Python, Flask, Docker, Kubernetes, AWS, PostgreSQL, Redis
+"""
+
+
+def seed(email, password):
+    """Create the schema, a user and one resume; prints the resume id."""
+    with app.app_context():
+        db.create_all()
+        user = User(username="bench", email=email)
+        user.set_password(password)
+        db.session.add(user)
+        db.session.flush()
+        resume = Resume(filename="bench.pdf", extracted_text=BENCH_RESUME, candidate_name="Jane Bench",
+                        structured_data=json.dumps(parse_sections(BENCH_RESUME)), user_id=user.id)
+        db.session.add(resume)
+        db.session.commit()
+        print(resume.id)
@@ -0,0 +1,103 @@
+"""Offline stand-in for Gemini used by the serving benchmarks.
+
+Run as a script it is an HTTP server that answers every generation with
+fake_gemini's model, so the text, timing and token usage match the in-process fake.
+`install(url)` points llm_pipeline at it through StubChatModel, so the app
+exercises the same chains, middleware and caches it uses in production. Unlike
+fake_gemini.install, every generation then waits on a real HTTP call to another
+process, which is the wait the WSGI and ASGI servers handle differently.
+
+Usage:
+    python benchmarks/stub_llm.py --port 8900 --latency 0.5 [--token-rate 0]
+"""
+import argparse
+import os
+import sys
+import threading
+
+import aiohttp
+import requests
+from aiohttp import web
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fake_gemini  # noqa: E402
+import llm_pipeline  # noqa: E402
+
+_local = threading.local()
+_async_session = None
+
+
+def _session():
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def _client_session():
+    # Only used from llm_pipeline's client loop, so one pooled session serves the process
+    global _async_session
+    if _async_session is None:
+        _async_session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+    return _async_session
+
+
+def _prompt(messages):
+    # The same prompt fake_gemini builds, so the server answers as the in-process fake would
+    return "\n".join(str(message.content) for message in messages)
+
+
+def _result(payload):
+    message = AIMessage(content=payload["text"], usage_metadata=payload["usage"])
+    return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class StubChatModel(BaseChatModel):
+    url: str
+
+    @property
+    def _llm_type(self):
+        return "stub"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        response = _session().post(self.url, json={"prompt": _prompt(messages)})
+        response.raise_for_status()
+        return _result(response.json())
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        async with _client_session().post(self.url, json={"prompt": _prompt(messages)}) as response:
+            response.raise_for_status()
+            return _result(await response.json())
+
+
+def install(url):
+    """Make every generation in this process call the stub server at `url`."""
+    model = StubChatModel(url=url)
+    llm_pipeline.get_model = lambda model_name=None, temperature=None: model
+    llm_pipeline.get_async_model = lambda model_name=None, temperature=None: model
+
+
+def serve(port, config):
+    fake_gemini.install(config)
+    model = fake_gemini.FakeGeminiChat()
+
+    async def generate(request):
+        payload = await request.json()
+        message = await model.ainvoke(payload["prompt"])
+        return web.json_response({"text": message.content, "usage": message.usage_metadata})
+
+    app = web.Application()
+    app.router.add_post("/generate", generate)
+    web.run_app(app, host="127.0.0.1", port=port, print=None, backlog=4096)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="completion tokens per second; 0 for instant")
+    args = parser.parse_args()
+    serve(args.port, fake_gemini.FakeGeminiConfig(latency=args.latency, token_rate=args.token_rate))
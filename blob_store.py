@@ -0,0 +1,182 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BLOB_STORE_BACKEND = os.getenv("BLOB_STORE_BACKEND", "local")
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", "blobs")
+
+# S3-compatible backend settings (AWS, MinIO, R2, ...)
+S3_BUCKET = os.getenv("S3_BUCKET")
+S3_PREFIX = os.getenv("S3_PREFIX", "resumes/")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+
+# Downloads from S3 stay in memory up to this size before spilling to disk
+S3_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+def content_key(data):
+    """Blobs are addressed by the SHA-256 of their content, so identical uploads are stored once."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobStore:
+    """Interface for content-addressed storage of uploaded resume files."""
+
+    def put(self, data, key=None):
+        """Store bytes and return their key; storing existing content is a no-op.
+
+        Pass `key` when the content hash is already known to avoid hashing twice.
+        """
+        raise NotImplementedError
+
+    def put_file(self, path, key):
+        """Store the file at `path` under `key` without reading it into memory."""
+        raise NotImplementedError
+
+    def open(self, key):
+        """Return a seekable binary file object for a blob."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def local_path(self, key):
+        """Filesystem path of a blob if the backend has one, so it can be served with sendfile."""
+        return None
+
+
+class LocalBlobStore(BlobStore):
+    def __init__(self, root=BLOB_STORE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        # Shard by hash prefix to keep directories small
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put(self, data, key=None):
+        key = key or content_key(data)
+        path = self._path(key)
+        if os.path.exists(path):
+            return key
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return key
+
+    def put_file(self, path, key):
+        target = self._path(key)
+        if os.path.exists(target):
+            return key
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target))
+        os.close(fd)
+        try:
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return key
+
+    def open(self, key):
+        return open(self._path(key), "rb")
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def local_path(self, key):
+        path = os.path.abspath(self._path(key))
+        return path if os.path.exists(path) else None
+
+
+class S3BlobStore(BlobStore):
+    def __init__(self, bucket=S3_BUCKET, prefix=S3_PREFIX, endpoint_url=S3_ENDPOINT_URL):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("The S3 blob store requires boto3. Install it with 'pip install boto3'.")
+
+        if not bucket:
+            raise RuntimeError("S3_BUCKET must be set to use the S3 blob store.")
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+
+    def _object_key(self, key):
+        return f"{self.prefix}{key}"
+
+    def put(self, data, key=None):
+        key = key or content_key(data)
+        if not self.exists(key):
+            self.client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=data)
+        return key
+
+    def put_file(self, path, key):
+        if not self.exists(key):
+            # upload_file streams from disk, using multipart uploads for large files
+            self.client.upload_file(path, self.bucket, self._object_key(key))
+        return key
+
+    def open(self, key):
+        response = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        spool = tempfile.SpooledTemporaryFile(max_size=S3_SPOOL_MAX_BYTES)
+        shutil.copyfileobj(response["Body"], spool)
+        spool.seek(0)
+        return spool
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except self.client.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+
+_BACKENDS = {
+    "local": LocalBlobStore,
+    "s3": S3BlobStore,
+}
+
+_store = None
+_lock = threading.Lock()
+
+
+def get_blob_store():
+    """Return the configured blob store (BLOB_STORE_BACKEND=local|s3)."""
+    global _store
+    with _lock:
+        if _store is None:
+            if BLOB_STORE_BACKEND not in _BACKENDS:
+                raise RuntimeError(f"Unknown blob store backend: {BLOB_STORE_BACKEND}")
+            _store = _BACKENDS[BLOB_STORE_BACKEND]()
+        return _store
@@ -0,0 +1,102 @@
+import os
+
+from dotenv import load_dotenv
+
+from faiss_store import get_resume_index, aget_resume_index
+from metrics import span
+from streaming import join_documents
+
+load_dotenv()
+
+# Resumes estimated below this many tokens are sent to the model whole, without retrieval
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+
+# Rough English average; good enough to decide between "fits" and "needs retrieval"
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def needs_retrieval(resume_text, token_budget=CONTEXT_TOKEN_BUDGET):
+    return estimate_tokens(resume_text) > token_budget
+
+
+def section_text(sections):
+    """Join (name, body) resume sections into prompt text."""
+    return "\n\n".join(f"{name.title()}:\n{body}" for name, body in sections)
+
+
+def assemble_context(resume_text, query, resume_id=None, token_budget=CONTEXT_TOKEN_BUDGET, sections=None):
+    """Return the resume text to place in a prompt.
+
+    `sections` limits the context to those (name, body) sections of the resume. Text
+    that fits the token budget is returned as-is, skipping embedding and retrieval
+    entirely. Otherwise the whole resume's index, the one built at upload, is searched
+    and its chunks most relevant to `query` (and within `sections`) are packed in
+    order of relevance until the budget is spent.
+    """
+    if not resume_text or not resume_text.strip():
+        raise ValueError("The text chunks are empty. Cannot create a vector store.")
+
+    selected = section_text(sections) if sections else resume_text
+    if not needs_retrieval(selected, token_budget):
+        return selected
+
+    vector_store = get_resume_index(resume_id, resume_text)
+    with span("retrieval"):
+        docs = vector_store.similarity_search(query, k=len(vector_store.index_to_docstore_id))
+    return _pack(_within_sections(docs, resume_text, sections), token_budget)
+
+
+async def aassemble_context(resume_text, query, resume_id=None, token_budget=CONTEXT_TOKEN_BUDGET, sections=None):
+    """assemble_context using the async embedding calls."""
+    if not resume_text or not resume_text.strip():
+        raise ValueError("The text chunks are empty. Cannot create a vector store.")
+
+    selected = section_text(sections) if sections else resume_text
+    if not needs_retrieval(selected, token_budget):
+        return selected
+
+    vector_store = await aget_resume_index(resume_id, resume_text)
+    with span("retrieval"):
+        docs = await vector_store.asimilarity_search(query, k=len(vector_store.index_to_docstore_id))
+    return _pack(_within_sections(docs, resume_text, sections), token_budget)
+
+
+def _within_sections(docs, resume_text, sections):
+    """Keep the chunks overlapping one of `sections` in the resume text.
+
+    Chunks and section bodies are both cut from the resume text, so they are located
+    by position. A section that can't be found (one whose heading repeats is stored
+    joined) doesn't filter, and neither does a filter that would leave nothing.
+    """
+    if not sections:
+        return docs
+    spans = []
+    for _, body in sections:
+        start = resume_text.find(body)
+        if start < 0:
+            return docs
+        spans.append((start, start + len(body)))
+
+    kept = []
+    for doc in docs:
+        start = resume_text.find(doc.page_content)
+        end = start + len(doc.page_content)
+        if start < 0 or any(start < span_end and span_start < end for span_start, span_end in spans):
+            kept.append(doc)
+    return kept or docs
+
+
+def _pack(docs, token_budget):
+    selected, used = [], 0
+    for doc in docs:
+        cost = estimate_tokens(doc.page_content)
+        if selected and used + cost > token_budget:
+            break
+        selected.append(doc)
+        used += cost
+
+    return join_documents(selected)
@@ -0,0 +1,117 @@
+from array import array
+import hashlib
+import os
+import threading
+
+from langchain_core.embeddings import Embeddings
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from dotenv import load_dotenv
+
+from disk_cache import DiskLRUCache
+from metrics import span
+
+load_dotenv()
+
+EMBEDDING_MODEL = "models/embedding-001"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join("cache", "embeddings.sqlite3"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+
+
+def embedding_key(model, kind, text):
+    """Content address of an embedding: hash of (model name, document/query, text)."""
+    digest = hashlib.sha256()
+    for part in (model, kind, text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _encode(vector):
+    return array("f", vector).tobytes()
+
+
+def _decode(blob):
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only calls the underlying model for texts it has never seen.
+
+    Documents and queries are cached separately because Gemini embeds them with a
+    different task type.
+    """
+
+    def __init__(self, underlying, model_name, cache):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.cache = cache
+
+    def _lookup(self, texts):
+        keys = [embedding_key(self.model_name, "document", text) for text in texts]
+        found = self.cache.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        return keys, found, missing
+
+    def _store(self, keys, found, missing, vectors):
+        new_entries = {key: _encode(vector) for key, vector in zip(missing, vectors)}
+        self.cache.set_many(new_entries)
+        found.update(new_entries)
+        return [_decode(found[key]) for key in keys]
+
+    def embed_documents(self, texts):
+        with span("embedding", "documents"):
+            keys, found, missing = self._lookup(texts)
+            vectors = self.underlying.embed_documents(list(missing.values())) if missing else []
+            return self._store(keys, found, missing, vectors)
+
+    async def aembed_documents(self, texts):
+        with span("embedding", "documents"):
+            keys, found, missing = self._lookup(texts)
+            vectors = await self.underlying.aembed_documents(list(missing.values())) if missing else []
+            return self._store(keys, found, missing, vectors)
+
+    def embed_query(self, text):
+        key = embedding_key(self.model_name, "query", text)
+        with span("embedding", "query"):
+            blob = self.cache.get(key)
+            if blob is None:
+                blob = _encode(self.underlying.embed_query(text))
+                self.cache.set(key, blob)
+        return _decode(blob)
+
+    async def aembed_query(self, text):
+        key = embedding_key(self.model_name, "query", text)
+        with span("embedding", "query"):
+            blob = self.cache.get(key)
+            if blob is None:
+                blob = _encode(await self.underlying.aembed_query(text))
+                self.cache.set(key, blob)
+        return _decode(blob)
+
+
+_cache = None
+_embeddings = {}
+_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = DiskLRUCache(EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES)
+        return _cache
+
+
+def get_embeddings(model=EMBEDDING_MODEL):
+    """Return the shared, cache-backed embeddings client for a model."""
+    cache = get_embedding_cache()
+    with _lock:
+        if model not in _embeddings:
+            _embeddings[model] = CachedEmbeddings(GoogleGenerativeAIEmbeddings(model=model), model, cache)
+        return _embeddings[model]
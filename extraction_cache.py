@@ -0,0 +1,43 @@
+import json
+import os
+import threading
+
+from dotenv import load_dotenv
+
+from disk_cache import DiskLRUCache
+from text_extraction import PREPROCESS_VERSION
+
+load_dotenv()
+
+EXTRACTION_CACHE_PATH = os.getenv("EXTRACTION_CACHE_PATH", os.path.join("cache", "extractions.sqlite3"))
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "2000"))
+
+_cache = None
+_lock = threading.Lock()
+
+
+def get_extraction_cache():
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = DiskLRUCache(EXTRACTION_CACHE_PATH, max_entries=EXTRACTION_CACHE_MAX_ENTRIES)
+        return _cache
+
+
+def _key(content_hash):
+    # Changing the preprocessing invalidates earlier results
+    return f"{PREPROCESS_VERSION}:{content_hash}"
+
+
+def get_cached_extraction(content_hash):
+    """Return (preprocessed text, parsed sections) previously extracted from a file with this SHA-256, if any."""
+    blob = get_extraction_cache().get(_key(content_hash))
+    if blob is None:
+        return None
+    entry = json.loads(blob)
+    return entry["text"], entry["sections"]
+
+
+def cache_extraction(content_hash, text, sections):
+    entry = {"text": text, "sections": sections}
+    get_extraction_cache().set(_key(content_hash), json.dumps(entry).encode("utf-8"))
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import pickle
+import shutil
+import time
+import uuid
+
+import faiss
+from langchain_community.vectorstores import FAISS
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from dotenv import load_dotenv
+
+from embedding_cache import get_embeddings
+from metrics import span
+
+load_dotenv()
+
+FAISS_INDEX_DIR = os.getenv("FAISS_INDEX_DIR", "faiss_indices")
+
+# Indices that have not been read for this long are evicted by the cleanup thread
+FAISS_INDEX_MAX_IDLE = int(os.getenv("FAISS_INDEX_MAX_IDLE", str(7 * 24 * 60 * 60)))
+
+os.makedirs(FAISS_INDEX_DIR, exist_ok=True)
+
+_text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+
+
+def get_text_chunks(text):
+    with span("chunking"):
+        return _text_splitter.split_text(text)
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def resume_index_path(resume_id, text):
+    """Each index lives in its own directory keyed by resume id and a hash of the indexed text."""
+    return os.path.join(FAISS_INDEX_DIR, f"resume_{resume_id}_{text_hash(text)}")
+
+
+def _chunks(text):
+    text_chunks = get_text_chunks(text)
+    if not text_chunks:
+        raise ValueError("The text chunks are empty. Cannot create a vector store.")
+    return text_chunks
+
+
+def _from_text(text):
+    chunks = _chunks(text)
+    with span("faiss_build"):
+        return FAISS.from_texts(chunks, embedding=get_embeddings())
+
+
+async def _afrom_text(text):
+    chunks = _chunks(text)
+    with span("faiss_build"):
+        return await FAISS.afrom_texts(chunks, embedding=get_embeddings())
+
+
+def build_resume_index(resume_id, text):
+    """Embed a resume and persist its index; safe to call concurrently for the same resume."""
+    return _publish(resume_id, text, _from_text(text))
+
+
+async def abuild_resume_index(resume_id, text):
+    """build_resume_index without blocking the event loop on the embedding calls."""
+    return _publish(resume_id, text, await _afrom_text(text))
+
+
+def _publish(resume_id, text, vector_store):
+    path = resume_index_path(resume_id, text)
+    if os.path.isdir(path):
+        return vector_store
+
+    # Write to a private directory first so readers never see a half-written index
+    tmp_path = f"{path}.tmp-{uuid.uuid4().hex}"
+    vector_store.save_local(tmp_path)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # Another request published the same index first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    return vector_store
+
+
+def load_resume_index(resume_id, text):
+    """Load a persisted index memory-mapped, or return None if it has not been built."""
+    path = resume_index_path(resume_id, text)
+    index_file = os.path.join(path, "index.faiss")
+    if not os.path.exists(index_file):
+        return None
+
+    try:
+        index = faiss.read_index(index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        # Not every index type supports mmap; fall back to a regular read
+        index = faiss.read_index(index_file)
+
+    with open(os.path.join(path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+
+    # The directory mtime doubles as the last-access time used for eviction
+    os.utime(path)
+
+    return FAISS(get_embeddings(), index, docstore, index_to_docstore_id)
+
+
+def get_resume_index(resume_id, text):
+    """Return the vector store for a resume, building it if needed.
+
+    Without a resume id (ad-hoc text) the index is built in memory and not persisted.
+    """
+    if resume_id is None:
+        return _from_text(text)
+    return _load_existing(resume_id, text) or build_resume_index(resume_id, text)
+
+
+async def aget_resume_index(resume_id, text):
+    if resume_id is None:
+        return await _afrom_text(text)
+    return _load_existing(resume_id, text) or await abuild_resume_index(resume_id, text)
+
+
+def _load_existing(resume_id, text):
+    try:
+        return load_resume_index(resume_id, text)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+
+def link_resume_index(source_resume_id, resume_id, text):
+    """Share an existing resume's index with a re-upload of the same file; returns False if there is none."""
+    source = resume_index_path(source_resume_id, text)
+    target = resume_index_path(resume_id, text)
+    if not os.path.isdir(source):
+        return False
+    try:
+        # Hard links make the copy free; the files are never modified in place
+        shutil.copytree(source, target, copy_function=os.link)
+    except FileExistsError:
+        pass
+    except OSError:
+        shutil.rmtree(target, ignore_errors=True)
+        return False
+    return True
+
+
+def delete_resume_indices(resume_id):
+    prefix = f"resume_{resume_id}_"
+    for name in os.listdir(FAISS_INDEX_DIR):
+        if name.startswith(prefix):
+            shutil.rmtree(os.path.join(FAISS_INDEX_DIR, name), ignore_errors=True)
+
+
+def evict_stale_indices(max_idle=FAISS_INDEX_MAX_IDLE):
+    """Remove indices (and abandoned temp directories) not accessed within max_idle seconds."""
+    cutoff = time.time() - max_idle
+    evicted = 0
+    for name in os.listdir(FAISS_INDEX_DIR):
+        path = os.path.join(FAISS_INDEX_DIR, name)
+        try:
+            if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path)
+                evicted += 1
+        except OSError:
+            # Raced with a concurrent eviction or rebuild; try again next round
+            continue
+    return evicted
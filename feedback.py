@@ -1,60 +1,9 @@
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-import google.generativeai as genai
-from langchain_community.vectorstores import FAISS
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains.question_answering import load_qa_chain
-from langchain.prompts import PromptTemplate
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from dotenv import load_dotenv
-import os
+from llm_pipeline import PromptSpec, generate, stream
+from roast import RESUME_FOCUS_QUERY, RESUME_FOCUS_SECTIONS
 
-load_dotenv()
-
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-
-FAISS_INDEX_DIR = "faiss_indices"
-
-# Ensure the directory exists
-os.makedirs(FAISS_INDEX_DIR, exist_ok=True)
-
-
-def remove_duplicate_lines(text):
-    lines = text.split("\n")
-    unique_lines = []
-    seen_lines = set()
-    for line in lines:
-        if line.strip() not in seen_lines:
-            unique_lines.append(line.strip())
-            seen_lines.add(line.strip())
-    return "\n".join(unique_lines)
-
-
-async def get_text_chunks(text):
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    return text_splitter.split_text(text)
-
-
-async def create_faiss_index(text_chunks, index_name):
-    if not text_chunks:
-        raise ValueError("The text chunks are empty. Cannot create a vector store.")
-
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-    vector_store = FAISS.from_texts(text_chunks, embedding=embeddings)
-
-    # Save the FAISS index
-    index_path = os.path.join(FAISS_INDEX_DIR, f"{index_name}.faiss")
-    vector_store.save_local(index_path)
-
-    return vector_store
-
-
-async def load_faiss_index(index_name, embeddings):
-    index_path = os.path.join(FAISS_INDEX_DIR, f"{index_name}.faiss")
-    return FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True)
-
-
-async def get_feedback_chain(candidate_name):
-    prompt_template = f"""When provided with a resume belonging to {candidate_name}, generate constructive and serious feedback addressing the following points:
+FEEDBACK_PROMPT = PromptSpec(
+    name="feedback",
+    template="""When provided with a resume belonging to {candidate_name}, generate constructive and serious feedback addressing the following points:
 
     Use HTML tags for formatting instead of markdown. Specifically:
     
@@ -117,32 +66,26 @@ async def get_feedback_chain(candidate_name):
     
     13. Do not comment on the formatting or the use of a formal resume template.
 
-    Context:\n {{context}}
+    Context:\n {context}
 
     Resume:
-    """
-    model = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=1)
-    prompt = PromptTemplate(template=prompt_template, input_variables=["context"])
-    return load_qa_chain(model, chain_type="stuff", prompt=prompt)
-
-
-async def generate_feedback(resume_text, candidate_name):
-    text_chunks = await get_text_chunks(resume_text)
-    if not text_chunks:
-        return "Error: The document is empty or could not be processed."
-
-    try:
-        # Create and save the FAISS index
-        vector_store = await create_faiss_index(text_chunks, "feedback_index")
-    except ValueError as e:
-        return str(e)
-
-    docs = vector_store.similarity_search(resume_text)
-
-    chain = await get_feedback_chain(candidate_name)
-    response = chain.invoke({"input_documents": docs, "context": resume_text})
-
-    feedback_response = response["output_text"].replace("*", "\"")
-    feedback_response = remove_duplicate_lines(feedback_response)
-
-    return feedback_response
+    """,
+    input_variables=("candidate_name",),
+    temperature=1,
+    version="2",
+    retrieval_query=RESUME_FOCUS_QUERY,
+    sections=RESUME_FOCUS_SECTIONS,
+    replace_asterisks=True,
+    dedupe_lines=True,
+)
+
+
+async def generate_feedback(resume_text, candidate_name, resume_id=None, regenerate=False, structured=None):
+    return await generate(FEEDBACK_PROMPT, resume_text, resume_id, {"bypass_cache": regenerate}, structured,
+                          candidate_name=candidate_name)
+
+
+def stream_feedback(resume_text, candidate_name, resume_id=None, regenerate=False, structured=None):
+    """Yield the feedback incrementally, applying the same clean-up as generate_feedback line by line."""
+    return stream(FEEDBACK_PROMPT, resume_text, resume_id, {"bypass_cache": regenerate}, structured,
+                  candidate_name=candidate_name)
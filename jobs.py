@@ -0,0 +1,140 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import inspect
+import os
+import threading
+import time
+import uuid
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "100"))
+
+# Finished jobs are kept in memory this long; the database copy outlives them
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "900"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFull(Exception):
+    """Raised when more jobs are pending than the backend accepts."""
+
+
+class Job:
+    def __init__(self, feature, context=None, job_id=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.feature = feature
+        self.context = context or {}
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "feature": self.feature,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class LocalJobBackend:
+    """In-process job runner backed by a bounded thread pool.
+
+    Job functions may be plain callables or coroutine functions; coroutines get their
+    own event loop on the worker thread. `on_update` is called with the Job every time
+    its status changes, which is where the app persists it.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING, on_update=None):
+        self.max_pending = max_pending
+        self.on_update = on_update
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._cond = threading.Condition()
+
+    def submit(self, feature, fn, args=(), kwargs=None, context=None):
+        """Queue fn(*args, **kwargs) and return its Job immediately.
+
+        `context` is opaque metadata (e.g. the owning user) passed through to `on_update`.
+        """
+        with self._cond:
+            self._prune()
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            if pending >= self.max_pending:
+                raise QueueFull(f"{pending} generation jobs are already pending.")
+
+            job = Job(feature, context)
+            self._jobs[job.id] = job
+
+        self._notify(job)
+        self._executor.submit(self._run, job, fn, args, kwargs or {})
+        return job
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id, timeout=None, status=None):
+        """Block until the job finishes or the timeout expires; returns the job (or None).
+
+        With `status`, also return as soon as the job's status is no longer that one.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None or job.finished or (status is not None and job.status != status):
+                    return job
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return job
+                self._cond.wait(remaining)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job, fn, args, kwargs):
+        self._set_status(job, RUNNING)
+        try:
+            if inspect.iscoroutinefunction(fn):
+                result = asyncio.run(fn(*args, **kwargs))
+            else:
+                result = fn(*args, **kwargs)
+        except Exception as e:
+            job.error = str(e)
+            self._set_status(job, FAILED)
+        else:
+            job.result = result
+            self._set_status(job, DONE)
+
+    def _set_status(self, job, status):
+        with self._cond:
+            job.status = status
+            if job.finished:
+                job.finished_at = time.time()
+            self._cond.notify_all()
+        self._notify(job)
+
+    def _notify(self, job):
+        if self.on_update is None:
+            return
+        try:
+            self.on_update(job)
+        except Exception as e:
+            print(f'Error persisting job {job.id}: {e}')
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]
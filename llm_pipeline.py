@@ -0,0 +1,295 @@
+import asyncio
+from dataclasses import dataclass
+import os
+import threading
+
+import google.generativeai as genai
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain.prompts import PromptTemplate
+from dotenv import load_dotenv
+
+from context_assembly import assemble_context, aassemble_context, section_text
+from metrics import record_tokens, span
+from response_cache import response_cache_middleware
+from single_flight import single_flight_middleware
+from streaming import filter_stream
+
+load_dotenv()
+
+genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+
+DEFAULT_MODEL = "gemini-1.5-flash"
+
+
+@dataclass(frozen=True)
+class PromptSpec:
+    """Everything that distinguishes one generation feature from another.
+
+    `template` may reference `{context}` (the assembled resume text) plus any of
+    `input_variables`. When the resume was parsed into sections at upload, only the
+    named `sections` are sent. When that is still too long to send whole,
+    `retrieval_query` (or the input named by `query_variable`) picks the most
+    relevant chunks.
+    """
+    name: str
+    template: str
+    input_variables: tuple = ()
+    temperature: float = 0.7
+    model: str = DEFAULT_MODEL
+    version: str = "1"
+    uses_context: bool = True
+    retrieval_query: str = None
+    query_variable: str = None
+    sections: tuple = ()
+    replace_asterisks: bool = False
+    dedupe_lines: bool = False
+    empty_message: str = "Error: The document is empty or could not be processed."
+
+
+class Generation:
+    """A single model call as seen by the middleware chain."""
+
+    def __init__(self, spec, inputs, resume_text=None, resume_id=None, stream=False, options=None, structured=None,
+                 asynchronous=False):
+        self.spec = spec
+        self.inputs = inputs
+        self.resume_text = resume_text
+        self.resume_id = resume_id
+        self.structured = structured
+        self.stream = stream
+        self.asynchronous = asynchronous
+        self.options = options or {}
+
+
+_models = {}
+_chains = {}
+_async_models = {}
+_async_chains = {}
+_middleware = []
+_lock = threading.Lock()
+
+_client_loop = None
+_client_loop_pid = None
+
+
+def get_model(model=DEFAULT_MODEL, temperature=0.7):
+    """Return the shared chat model client for a (model, temperature) pair."""
+    key = (model, temperature)
+    with _lock:
+        if key not in _models:
+            _models[key] = ChatGoogleGenerativeAI(model=model, temperature=temperature)
+        return _models[key]
+
+
+def get_client_loop():
+    """Return the process-wide event loop that the async model clients live on.
+
+    The Gemini async client holds a gRPC channel bound to the loop it was created on.
+    Flask runs each async view in a fresh loop, so the clients get a long-lived loop of
+    their own instead: every in-flight generation in the process is multiplexed over one
+    pooled channel per model, whichever loop or thread awaits it.
+    """
+    global _client_loop, _client_loop_pid
+    with _lock:
+        # A forked worker inherits the loop object but not the thread running it
+        if _client_loop is None or _client_loop_pid != os.getpid():
+            _client_loop = asyncio.new_event_loop()
+            _client_loop_pid = os.getpid()
+            threading.Thread(target=_client_loop.run_forever, name="llm-client-loop", daemon=True).start()
+        return _client_loop
+
+
+async def on_client_loop(coro):
+    """Await a coroutine that runs on the client loop from any other event loop."""
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, get_client_loop()))
+
+
+def get_async_model(model=DEFAULT_MODEL, temperature=0.7):
+    """Return the shared async chat model client; only call this on the client loop."""
+    key = (model, temperature)
+    with _lock:
+        if key not in _async_models:
+            # Must be constructed inside the running loop for the async client to be created
+            _async_models[key] = ChatGoogleGenerativeAI(model=model, temperature=temperature)
+        return _async_models[key]
+
+
+def _prompt(spec):
+    variables = (["context"] if spec.uses_context else []) + list(spec.input_variables)
+    return PromptTemplate(template=spec.template, input_variables=variables)
+
+
+def get_chain(spec):
+    """Return the compiled prompt | model chain for a spec, built once per process.
+
+    The chain yields the model's message rather than a string so its token usage can be recorded.
+    """
+    with _lock:
+        chain = _chains.get(spec.name)
+    if chain is None:
+        chain = _prompt(spec) | get_model(spec.model, spec.temperature)
+        with _lock:
+            chain = _chains.setdefault(spec.name, chain)
+    return chain
+
+
+def get_async_chain(spec):
+    """Return the chain for a spec on the async model client; only call this on the client loop."""
+    with _lock:
+        chain = _async_chains.get(spec.name)
+    if chain is None:
+        chain = _prompt(spec) | get_async_model(spec.model, spec.temperature)
+        with _lock:
+            chain = _async_chains.setdefault(spec.name, chain)
+    return chain
+
+
+async def _ainvoke(spec, inputs):
+    return await get_async_chain(spec).ainvoke(inputs)
+
+
+def register_middleware(middleware):
+    """Wrap every generation with `middleware(generation, call_next)`.
+
+    This is the single hook point for caching, retries, metrics and the like. For a
+    streaming generation `call_next` returns an iterator of text chunks instead of a
+    string, and for an asynchronous one an awaitable of the string; the middleware
+    must return the same kind of value. Middleware registered first runs outermost.
+    """
+    _middleware.append(middleware)
+    return middleware
+
+
+# Outermost, so a generation that waited on another process finds its response in the cache
+register_middleware(single_flight_middleware)
+register_middleware(response_cache_middleware)
+
+
+def remove_duplicate_lines(text):
+    lines = text.split("\n")
+    unique_lines = []
+    seen_lines = set()
+    for line in lines:
+        if line.strip() not in seen_lines:
+            unique_lines.append(line.strip())
+            seen_lines.add(line.strip())
+    return "\n".join(unique_lines)
+
+
+def _sections(generation):
+    """The (name, body) sections a spec needs if the resume was parsed, otherwise None for all of it."""
+    sections = (generation.structured or {}).get("sections")
+    if generation.spec.sections and sections:
+        return [(name, sections[name]) for name in generation.spec.sections if sections.get(name)] or None
+    return None
+
+
+def _context_query(generation):
+    sections = _sections(generation)
+    spec = generation.spec
+    query = spec.retrieval_query or generation.inputs.get(spec.query_variable)
+    return sections, query or (section_text(sections) if sections else generation.resume_text)
+
+
+def _prompt_inputs(generation):
+    inputs = dict(generation.inputs)
+    if generation.spec.uses_context:
+        sections, query = _context_query(generation)
+        inputs["context"] = assemble_context(generation.resume_text, query, generation.resume_id,
+                                             sections=sections)
+    return inputs
+
+
+async def _aprompt_inputs(generation):
+    inputs = dict(generation.inputs)
+    if generation.spec.uses_context:
+        sections, query = _context_query(generation)
+        inputs["context"] = await aassemble_context(generation.resume_text, query, generation.resume_id,
+                                                    sections=sections)
+    return inputs
+
+
+def _call_model(generation):
+    spec = generation.spec
+    if generation.asynchronous:
+        return _acall_model(generation)
+
+    chain = get_chain(spec)
+    inputs = _prompt_inputs(generation)
+
+    if generation.stream:
+        return filter_stream(_stream_text(spec, chain.stream(inputs)), dedupe=spec.dedupe_lines,
+                             replace_asterisks=spec.replace_asterisks)
+
+    with span("llm", spec.name):
+        message = chain.invoke(inputs)
+    record_tokens(spec.name, message.usage_metadata)
+    return _clean(spec, message.content)
+
+
+async def _acall_model(generation):
+    spec = generation.spec
+    inputs = await _aprompt_inputs(generation)
+    with span("llm", spec.name):
+        message = await on_client_loop(_ainvoke(spec, inputs))
+    record_tokens(spec.name, message.usage_metadata)
+    return _clean(spec, message.content)
+
+
+def _stream_text(spec, chunks):
+    # The model reports usage on the final chunk
+    usage = None
+    with span("llm", spec.name):
+        for chunk in chunks:
+            usage = chunk.usage_metadata or usage
+            yield chunk.content
+    record_tokens(spec.name, usage)
+
+
+def _clean(spec, text):
+    with span("postprocess", spec.name):
+        if spec.replace_asterisks:
+            text = text.replace("*", "\"")
+        if spec.dedupe_lines:
+            text = remove_duplicate_lines(text)
+        return text.strip()
+
+
+def _run(generation):
+    def call(index, current):
+        if index == len(_middleware):
+            return _call_model(current)
+        return _middleware[index](current, lambda nxt: call(index + 1, nxt))
+
+    return call(0, generation)
+
+
+def _empty(spec, resume_text):
+    return spec.uses_context and (not resume_text or not resume_text.strip())
+
+
+def run(spec, resume_text=None, resume_id=None, options=None, structured=None, **inputs):
+    """Generate a complete response for a spec.
+
+    `structured` is the resume's parse_sections output, if it has one.
+    """
+    if _empty(spec, resume_text):
+        return spec.empty_message
+    return _run(Generation(spec, inputs, resume_text, resume_id, options=options, structured=structured))
+
+
+async def generate(spec, resume_text=None, resume_id=None, options=None, structured=None, **inputs):
+    """run() on the async model and embedding clients, so waiting on Gemini does not hold a thread."""
+    if _empty(spec, resume_text):
+        return spec.empty_message
+    return await _run(Generation(spec, inputs, resume_text, resume_id, options=options, structured=structured,
+                                 asynchronous=True))
+
+
+def stream(spec, resume_text=None, resume_id=None, options=None, structured=None, **inputs):
+    """Yield a response for a spec as the model produces it."""
+    if _empty(spec, resume_text):
+        yield spec.empty_message
+        return
+    yield from _run(Generation(spec, inputs, resume_text, resume_id, stream=True, options=options,
+                               structured=structured))
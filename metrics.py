@@ -0,0 +1,137 @@
+from contextlib import contextmanager
+import contextvars
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Histogram, REGISTRY, generate_latest
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+load_dotenv()
+
+# Adds a Server-Timing header with the request's stage timings, DB queries and tokens
+METRICS_DEBUG_HEADER = os.getenv("METRICS_DEBUG_HEADER", "0") == "1"
+# When set, /metrics requires "Authorization: Bearer <token>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Model calls routinely take tens of seconds, well past the client library's default buckets
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+REQUEST_SECONDS = Histogram("cvmaster_request_seconds", "Request handling time by endpoint",
+                            ["endpoint", "method", "status"], buckets=SECONDS_BUCKETS)
+STAGE_SECONDS = Histogram("cvmaster_stage_seconds", "Time spent in each pipeline stage",
+                          ["stage", "feature"], buckets=SECONDS_BUCKETS)
+LLM_TOKENS = Histogram("cvmaster_llm_tokens", "Tokens per model call as reported by the model",
+                       ["feature", "kind"], buckets=TOKEN_BUCKETS)
+DB_QUERIES = Histogram("cvmaster_db_queries", "SQL statements executed per request",
+                       ["endpoint"], buckets=QUERY_BUCKETS)
+DB_QUERY_SECONDS = Histogram("cvmaster_db_query_seconds", "Time per SQL statement", buckets=SECONDS_BUCKETS)
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """What one request spent its time on; shared by every thread and task working for it."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self.threads = set()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def stage_totals(self):
+        totals = {}
+        for stage, _, _, duration in self.spans:
+            totals[stage] = totals.get(stage, 0.0) + duration
+        return totals
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current_request():
+    return _current.get()
+
+
+@contextmanager
+def span(stage, feature=""):
+    """Time a pipeline stage, e.g. `with span("embedding"):`; nested spans are each recorded."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage, feature).observe(duration)
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.spans.append((stage, feature, started - metrics.started, duration))
+            metrics.threads.add(threading.get_ident())
+
+
+def record_tokens(feature, usage):
+    """Record the usage_metadata of a model response, if the model reported one."""
+    if not usage:
+        return
+    LLM_TOKENS.labels(feature, "prompt").observe(usage["input_tokens"])
+    LLM_TOKENS.labels(feature, "completion").observe(usage["output_tokens"])
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.prompt_tokens += usage["input_tokens"]
+        metrics.completion_tokens += usage["output_tokens"]
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_started"].pop()
+    DB_QUERY_SECONDS.observe(duration)
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.queries += 1
+        metrics.query_seconds += duration
+
+
+def observe_request(metrics, endpoint, method, status):
+    REQUEST_SECONDS.labels(endpoint, method, status).observe(time.perf_counter() - metrics.started)
+    DB_QUERIES.labels(endpoint).observe(metrics.queries)
+
+
+def server_timing(metrics):
+    """Server-Timing header value: per-stage totals, DB time and the whole request, in ms."""
+    entries = []
+    for stage, duration in metrics.stage_totals().items():
+        entry = f"{stage};dur={duration * 1000:.1f}"
+        if stage == "llm" and (metrics.prompt_tokens or metrics.completion_tokens):
+            entry += f';desc="{metrics.prompt_tokens} prompt + {metrics.completion_tokens} completion tokens"'
+        entries.append(entry)
+    entries.append(f'db;dur={metrics.query_seconds * 1000:.1f};desc="{metrics.queries} queries"')
+    entries.append(f"total;dur={(time.perf_counter() - metrics.started) * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def render_metrics():
+    """Prometheus exposition of all metrics, merged across workers when PROMETHEUS_MULTIPROC_DIR is set."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
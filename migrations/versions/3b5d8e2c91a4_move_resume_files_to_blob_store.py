@@ -0,0 +1,116 @@
+"""Move resume files out of 'Resume.data' into the blob store
+
+Revision ID: 3b5d8e2c91a4
+Revises: 7c1e4b9a2f3d
+Create Date: 2026-10-18 11:02:17.554930
+
+"""
+import hashlib
+import os
+import tempfile
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b5d8e2c91a4'
+down_revision = '7c1e4b9a2f3d'
+branch_labels = None
+depends_on = None
+
+# Rows are moved in small batches so the migration never holds many files in memory
+BATCH_SIZE = 50
+
+# Blob layout at this revision, written out here so later changes to blob_store.py
+# cannot change what this migration does: files are named by their SHA-256, under
+# <dir>/<2 chars>/<2 chars>/ locally or <prefix><key> in an S3 bucket
+BLOB_STORE_BACKEND = os.getenv('BLOB_STORE_BACKEND', 'local')
+BLOB_STORE_DIR = os.getenv('BLOB_STORE_DIR', 'blobs')
+S3_BUCKET = os.getenv('S3_BUCKET')
+S3_PREFIX = os.getenv('S3_PREFIX', 'resumes/')
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')
+
+
+def _local_path(key):
+    return os.path.join(BLOB_STORE_DIR, key[:2], key[2:4], key)
+
+
+def _blob_client():
+    """An S3 client for the s3 backend, None for the local directory."""
+    if BLOB_STORE_BACKEND == 'local':
+        return None
+    if BLOB_STORE_BACKEND != 's3':
+        raise RuntimeError(f"Unknown blob store backend: {BLOB_STORE_BACKEND}")
+    if not S3_BUCKET:
+        raise RuntimeError("S3_BUCKET must be set to move resume files to S3.")
+    import boto3
+    return boto3.client('s3', endpoint_url=S3_ENDPOINT_URL)
+
+
+def _put_blob(s3, data):
+    key = hashlib.sha256(data).hexdigest()
+    if s3 is not None:
+        # Identical files share a key; rewriting the same content is harmless
+        s3.put_object(Bucket=S3_BUCKET, Key=f'{S3_PREFIX}{key}', Body=data)
+        return key
+
+    path = _local_path(key)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    return key
+
+
+def _read_blob(s3, key):
+    if s3 is not None:
+        return s3.get_object(Bucket=S3_BUCKET, Key=f'{S3_PREFIX}{key}')['Body'].read()
+    with open(_local_path(key), 'rb') as f:
+        return f.read()
+
+
+def upgrade():
+    with op.batch_alter_table('resume', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('blob_key', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('file_size', sa.Integer(), nullable=True))
+        batch_op.alter_column('data', existing_type=sa.LargeBinary(), nullable=True)
+        batch_op.create_index(batch_op.f('ix_resume_blob_key'), ['blob_key'], unique=False)
+
+    bind = op.get_bind()
+    s3 = _blob_client()
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.text(
+            "SELECT id, data FROM resume WHERE data IS NOT NULL AND id > :last_id ORDER BY id LIMIT :limit"
+        ), {'last_id': last_id, 'limit': BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+
+        for resume_id, data in rows:
+            data = bytes(data)
+            bind.execute(sa.text(
+                "UPDATE resume SET blob_key = :blob_key, file_size = :file_size, data = NULL WHERE id = :id"
+            ), {'blob_key': _put_blob(s3, data), 'file_size': len(data), 'id': resume_id})
+            last_id = resume_id
+
+
+def downgrade():
+    bind = op.get_bind()
+    s3 = _blob_client()
+    rows = bind.execute(sa.text("SELECT id, blob_key FROM resume WHERE blob_key IS NOT NULL")).fetchall()
+    for resume_id, blob_key in rows:
+        bind.execute(sa.text("UPDATE resume SET data = :data WHERE id = :id"),
+                     {'data': _read_blob(s3, blob_key), 'id': resume_id})
+
+    with op.batch_alter_table('resume', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_resume_blob_key'))
+        batch_op.alter_column('data', existing_type=sa.LargeBinary(), nullable=False)
+        batch_op.drop_column('file_size')
+        batch_op.drop_column('blob_key')
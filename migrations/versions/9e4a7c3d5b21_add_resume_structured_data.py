@@ -0,0 +1,28 @@
+"""Add 'structured_data' to 'Resume' for sections parsed at upload
+
+Revision ID: 9e4a7c3d5b21
+Revises: 3b5d8e2c91a4
+Create Date: 2026-10-18 13:27:05.642913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4a7c3d5b21'
+down_revision = '3b5d8e2c91a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing resumes are parsed afterwards with `flask backfill-structured-data`, which
+    # uses the app's current parser; until then they are served without structured data
+    with op.batch_alter_table('resume', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('structured_data', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('resume', schema=None) as batch_op:
+        batch_op.drop_column('structured_data')
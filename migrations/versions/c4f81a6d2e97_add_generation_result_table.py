@@ -0,0 +1,64 @@
+"""Add 'GenerationResult' table for versioned roasts and feedback, replacing the 'Resume' response columns
+
+Revision ID: c4f81a6d2e97
+Revises: 9e4a7c3d5b21
+Create Date: 2026-10-18 16:42:18.905317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f81a6d2e97'
+down_revision = '9e4a7c3d5b21'
+branch_labels = None
+depends_on = None
+
+FEATURES = (('roast', 'roast_response'), ('feedback', 'feedback_response'))
+
+
+def upgrade():
+    op.create_table('generation_result',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('resume_id', sa.Integer(), nullable=False),
+    sa.Column('feature', sa.String(length=32), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('model', sa.String(length=64), nullable=True),
+    sa.Column('prompt_version', sa.String(length=16), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('saved_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['resume_id'], ['resume.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('resume_id', 'feature', 'version')
+    )
+
+    # Responses users saved become version 1; which model and prompt made them is unknown
+    for feature, column in FEATURES:
+        op.execute(sa.text(
+            f"INSERT INTO generation_result (resume_id, feature, version, status, content, created_at, saved_at) "
+            f"SELECT id, :feature, 1, 'saved', {column}, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP FROM resume "
+            f"WHERE {column} IS NOT NULL AND {column} <> ''"
+        ).bindparams(feature=feature))
+
+    with op.batch_alter_table('resume', schema=None) as batch_op:
+        batch_op.drop_column('roast_response')
+        batch_op.drop_column('feedback_response')
+
+
+def downgrade():
+    with op.batch_alter_table('resume', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('roast_response', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('feedback_response', sa.Text(), nullable=True))
+
+    # Keep the newest saved version of each; drafts were never stored before
+    for feature, column in FEATURES:
+        op.execute(sa.text(
+            f"UPDATE resume SET {column} = (SELECT content FROM generation_result "
+            f"WHERE generation_result.resume_id = resume.id AND feature = :feature AND status = 'saved' "
+            f"ORDER BY version DESC LIMIT 1)"
+        ).bindparams(feature=feature))
+
+    op.drop_table('generation_result')
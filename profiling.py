@@ -0,0 +1,351 @@
+import html
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+import itertools
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Fraction of requests to profile, e.g. 0.01; 0 disables sampling
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Also keep the profile of every request slower than this many seconds; 0 disables
+PROFILE_SLOW_SECONDS = float(os.getenv("PROFILE_SLOW_SECONDS", "0"))
+# Requests that weren't sampled are only recorded once they have run this long, so fast
+# requests never wake the sampler; defaults to half of PROFILE_SLOW_SECONDS
+PROFILE_SLOW_ARM_SECONDS = float(os.getenv("PROFILE_SLOW_ARM_SECONDS", str(PROFILE_SLOW_SECONDS / 2)))
+# Seconds between stack samples while a profiled request is in flight
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.02"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# Profiles kept on disk; older ones are deleted as new ones are written
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+
+PROFILING_ENABLED = PROFILE_SAMPLE_RATE > 0 or PROFILE_SLOW_SECONDS > 0
+
+_HOT_FRAMES = 30
+
+_write_lock = threading.Lock()
+_sequence = itertools.count()
+
+
+class _Recording:
+    """A request's claim on the sampler's ticks, from `position` once it is armed."""
+
+    def __init__(self, arm_at):
+        self.arm_at = arm_at
+        self.position = None
+
+
+class _Sampler:
+    """One thread that snapshots every thread's stack while any profiled request is running.
+
+    Views don't stay on the request's thread: async views run on an asgiref event loop
+    thread, blocking work on to_thread pools and model calls on the client loop. So each
+    tick records the whole process once, however many requests are being profiled, and
+    a request keeps the ticks taken while it ran. Threads are marked busy when they used
+    CPU since the previous tick, which tells a parked worker from one doing work.
+    A recording started with a delay waits, without sampling, until it is armed.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._condition = threading.Condition()
+        self._active = {}
+        self._pending = set()
+        self._ticks = []
+        self._first_tick = 0
+        self._labels = {}
+        self._entries = {}
+        self._cpu = {}
+        self._pid = None
+
+    def start(self, delay=0):
+        """Start recording for a request now, or `delay` seconds from now if it is still running."""
+        with self._condition:
+            if self._pid != os.getpid():
+                # First use in this process (gunicorn forks workers after import)
+                self._pid = os.getpid()
+                self._active.clear()
+                self._pending.clear()
+                self._ticks.clear()
+                threading.Thread(target=self._run, name="profile-sampler", daemon=True).start()
+            recording = _Recording(time.monotonic() + delay)
+            if delay > 0:
+                self._pending.add(recording)
+            else:
+                self._arm(recording)
+            self._condition.notify()
+            return recording
+
+    def _arm(self, recording):
+        recording.position = self._first_tick + len(self._ticks)
+        self._active[recording.position] = self._active.get(recording.position, 0) + 1
+
+    def _arm_due(self):
+        """Arm the delayed recordings that are due; returns the seconds until the next one, or None."""
+        now = time.monotonic()
+        for recording in [recording for recording in self._pending if recording.arm_at <= now]:
+            self._pending.discard(recording)
+            self._arm(recording)
+        if not self._pending:
+            return None
+        return min(recording.arm_at for recording in self._pending) - now
+
+    def stop(self, recording):
+        """Return the ticks recorded for a request and stop recording for it."""
+        with self._condition:
+            if recording.position is None:
+                # Finished before it was armed
+                self._pending.discard(recording)
+                return []
+            position = recording.position
+            ticks = self._ticks[position - self._first_tick:]
+            self._active[position] -= 1
+            if not self._active[position]:
+                del self._active[position]
+            # Drop ticks no running profile needs any more
+            oldest = min(self._active, default=self._first_tick + len(self._ticks))
+            del self._ticks[:oldest - self._first_tick]
+            self._first_tick = oldest
+            if not self._active:
+                self._labels.clear()
+                self._entries.clear()
+                self._cpu.clear()
+            return ticks
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            with self._condition:
+                while True:
+                    next_arm = self._arm_due()
+                    if self._active:
+                        break
+                    self._condition.wait(next_arm)
+            time.sleep(self.interval)
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            tick = tuple(self._entry(ident, names.get(ident, str(ident)), frame)
+                         for ident, frame in sys._current_frames().items() if ident != me)
+            with self._condition:
+                if self._active:
+                    self._ticks.append(tick)
+
+    def _entry(self, ident, name, frame):
+        # Threads mostly sit in the same few places; share those entries between ticks
+        entry = (ident, name, self._stack(frame), self._busy(ident))
+        return self._entries.setdefault(entry, entry)
+
+    def _busy(self, ident):
+        try:
+            cpu = time.clock_gettime(time.pthread_getcpuclockid(ident))
+        except (AttributeError, OSError):
+            # No per-thread CPU clocks here, or the thread just exited
+            return True
+        previous = self._cpu.get(ident)
+        self._cpu[ident] = cpu
+        return previous is not None and cpu > previous
+
+    def _stack(self, frame):
+        """Root-first tuple of frame labels."""
+        labels = []
+        while frame is not None:
+            key = (frame.f_code, frame.f_lineno)
+            label = self._labels.get(key)
+            if label is None:
+                code = frame.f_code
+                label = f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+                self._labels[key] = label
+            labels.append(label)
+            frame = frame.f_back
+        return tuple(reversed(labels))
+
+
+_sampler = _Sampler(PROFILE_INTERVAL)
+
+
+class RequestProfile:
+    def __init__(self, method, path, sampled):
+        self.method = method
+        self.path = path
+        self.sampled = sampled
+        self.thread = threading.get_ident()
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.status = None
+        # Unsampled requests are only kept if slow; record them once they might be
+        self.recording = _sampler.start(0 if sampled else PROFILE_SLOW_ARM_SECONDS)
+
+
+def start_profile(method, path):
+    """Begin profiling the current request, or return None when it can't be kept."""
+    if not PROFILING_ENABLED:
+        return None
+    sampled = random.random() < PROFILE_SAMPLE_RATE
+    if not sampled and not PROFILE_SLOW_SECONDS:
+        return None
+    return RequestProfile(method, path, sampled)
+
+
+def finish_profile(profile, endpoint, metrics=None):
+    """Stop sampling; if the request was sampled or slow, write its profile in the background."""
+    duration = time.perf_counter() - profile.started
+    ticks = _sampler.stop(profile.recording)
+    threads = {profile.thread} | (metrics.threads if metrics is not None else set())
+    slow = PROFILE_SLOW_SECONDS and duration >= PROFILE_SLOW_SECONDS
+    if not (profile.sampled or slow):
+        return
+    spans = list(metrics.spans) if metrics is not None else []
+    summary = {
+        "queries": metrics.queries, "query_seconds": metrics.query_seconds,
+        "prompt_tokens": metrics.prompt_tokens, "completion_tokens": metrics.completion_tokens,
+    } if metrics is not None else {}
+    meta = {
+        "name": f"{profile.started_at:%Y%m%dT%H%M%S}-{os.getpid()}-{next(_sequence):06d}",
+        "time": profile.started_at.isoformat(timespec="seconds"),
+        "method": profile.method,
+        "path": profile.path,
+        "endpoint": endpoint,
+        "status": profile.status,
+        "duration": duration,
+        "reason": "slow" if slow else "sampled",
+        "samples": len(ticks),
+    }
+    threading.Thread(target=_write_profile, args=(meta, profile.thread, threads, ticks, spans, summary), daemon=True).start()
+
+
+def _aggregate(thread, threads, ticks):
+    """Folded stack counts: threads that worked for the request always, others only while busy."""
+    stacks = Counter()
+    for tick in ticks:
+        for ident, name, stack, busy in tick:
+            if ident == thread:
+                stacks[("request", stack)] += 1
+            elif ident in threads or busy:
+                stacks[(name, stack)] += 1
+    return stacks
+
+
+def _hot_frames(stacks):
+    own, total = Counter(), Counter()
+    for (_, stack), count in stacks.items():
+        if stack:
+            own[stack[-1]] += count
+        for label in set(stack):
+            total[label] += count
+    return [(label, own[label], count) for label, count in total.most_common(_HOT_FRAMES)]
+
+
+def _write_profile(meta, thread, threads, ticks, spans, summary):
+    try:
+        stacks = _aggregate(thread, threads, ticks)
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base = os.path.join(PROFILE_DIR, meta["name"])
+        with open(base + ".folded", "w") as f:
+            for (name, stack), count in stacks.items():
+                f.write(f"{name};{';'.join(stack)} {count}\n")
+        with open(base + ".html", "w") as f:
+            f.write(_render_profile(meta, stacks, spans, summary))
+        with _write_lock:
+            with open(os.path.join(PROFILE_DIR, "index.jsonl"), "a") as f:
+                f.write(json.dumps(meta) + "\n")
+            _rotate()
+            _write_index()
+    except Exception as e:
+        print(f"Error writing profile {meta['name']}: {e}")
+
+
+def _rotate():
+    names = sorted(name[:-len(".html")] for name in os.listdir(PROFILE_DIR)
+                   if name.endswith(".html") and name != "index.html")
+    for name in names[:-PROFILE_KEEP]:
+        for suffix in (".html", ".folded"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def _write_index():
+    """Rebuild index.html from index.jsonl, compacting the log to the profiles still on disk."""
+    log = os.path.join(PROFILE_DIR, "index.jsonl")
+    with open(log) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    entries = [entry for entry in entries if os.path.exists(os.path.join(PROFILE_DIR, entry["name"] + ".html"))]
+    if len(entries) > PROFILE_KEEP:
+        entries = entries[-PROFILE_KEEP:]
+    tmp = f"{log}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.writelines(json.dumps(entry) + "\n" for entry in entries)
+    os.replace(tmp, log)
+
+    rows = "".join(
+        f"<tr><td><a href=\"{html.escape(e['name'])}.html\">{html.escape(e['time'])}</a></td>"
+        f"<td>{html.escape(e['method'])} {html.escape(e['path'])}</td><td>{html.escape(str(e['endpoint']))}</td>"
+        f"<td>{e['status']}</td><td class=\"num\">{e['duration'] * 1000:.0f}</td><td>{e['reason']}</td>"
+        f"<td class=\"num\">{e['samples']}</td></tr>"
+        for e in reversed(entries))
+    tmp = os.path.join(PROFILE_DIR, f"index.html.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        f.write(_page("Request profiles",
+                      "<table><tr><th>Time</th><th>Request</th><th>Endpoint</th><th>Status</th><th>ms</th>"
+                      f"<th>Reason</th><th>Samples</th></tr>{rows}</table>"))
+    os.replace(tmp, os.path.join(PROFILE_DIR, "index.html"))
+
+
+def _render_profile(meta, stacks, spans, summary):
+    total = max(meta["duration"], 1e-9)
+    span_rows = "".join(
+        f"<tr><td>{html.escape(stage)}</td><td>{html.escape(feature)}</td><td class=\"num\">{offset * 1000:.0f}</td>"
+        f"<td class=\"num\">{duration * 1000:.1f}</td><td class=\"timeline\"><div class=\"bar\" style=\"margin-left:"
+        f"{min(offset / total, 1) * 100:.1f}%;width:{max(min(duration / total, 1) * 100, 0.2):.1f}%\"></div></td></tr>"
+        for stage, feature, offset, duration in sorted(spans, key=lambda span: span[2]))
+
+    samples = sum(stacks.values()) or 1
+    frame_rows = "".join(
+        f"<tr><td>{html.escape(label)}</td><td class=\"num\">{own * 100 / samples:.1f}</td>"
+        f"<td class=\"num\">{count * 100 / samples:.1f}</td></tr>"
+        for label, own, count in _hot_frames(stacks))
+
+    threads = Counter()
+    for (name, _), count in stacks.items():
+        threads[name] += count
+    thread_rows = "".join(f"<tr><td>{html.escape(name)}</td><td class=\"num\">{count}</td></tr>"
+                          for name, count in threads.most_common())
+
+    details = ", ".join(f"{key.replace('_', ' ')}: {value:.3f}" if isinstance(value, float)
+                        else f"{key.replace('_', ' ')}: {value}" for key, value in summary.items())
+    body = f"""<p><a href="index.html">All profiles</a></p>
+<p>{html.escape(meta['method'])} {html.escape(meta['path'])} &rarr; {html.escape(str(meta['endpoint']))},
+status {meta['status']}, {meta['duration'] * 1000:.0f} ms ({meta['reason']}), {meta['time']}</p>
+<p>{details}</p>
+<h2>Spans</h2>
+<table><tr><th>Stage</th><th>Feature</th><th>Start ms</th><th>ms</th><th>Timeline</th></tr>{span_rows}</table>
+<h2>Hot frames</h2>
+<p>{meta['samples']} samples every {PROFILE_INTERVAL * 1000:.0f} ms of the threads working for this request and any other
+thread using CPU; full stacks in
+<a href="{html.escape(meta['name'])}.folded">{html.escape(meta['name'])}.folded</a> (flame graph format).</p>
+<table><tr><th>Frame</th><th>Self %</th><th>Total %</th></tr>{frame_rows}</table>
+<h2>Threads</h2>
+<table><tr><th>Thread</th><th>Samples</th></tr>{thread_rows}</table>"""
+    return _page(f"Profile {meta['name']}", body)
+
+
+def _page(title, body):
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(title)}</title><style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; }}
+td, th {{ border-bottom: 1px solid #ddd; padding: 2px 8px; text-align: left; font-size: 13px; }}
+.num {{ text-align: right; }}
+.timeline {{ width: 400px; }}
+.bar {{ background: #4a7bd0; height: 10px; }}
+</style></head><body><h1>{html.escape(title)}</h1>
+{body}
+</body></html>
+"""
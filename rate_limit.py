@@ -0,0 +1,308 @@
+import asyncio
+import inspect
+import math
+import os
+import threading
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "local")
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+
+# Generations per minute, and how many may be started back to back, for each user and for
+# the whole deployment; 0 turns a limit off
+RATE_LIMIT_USER_PER_MINUTE = float(os.getenv("RATE_LIMIT_USER_PER_MINUTE", "10"))
+RATE_LIMIT_USER_BURST = int(os.getenv("RATE_LIMIT_USER_BURST", "5"))
+RATE_LIMIT_GLOBAL_PER_MINUTE = float(os.getenv("RATE_LIMIT_GLOBAL_PER_MINUTE", "600"))
+RATE_LIMIT_GLOBAL_BURST = int(os.getenv("RATE_LIMIT_GLOBAL_BURST", "60"))
+
+# Generations one user may have running at once; 0 for no cap
+RATE_LIMIT_USER_CONCURRENCY = int(os.getenv("RATE_LIMIT_USER_CONCURRENCY", "2"))
+# How long an extra generation waits for one of those to finish before it is rejected
+RATE_LIMIT_QUEUE_SECONDS = float(os.getenv("RATE_LIMIT_QUEUE_SECONDS", "10"))
+
+# A running-generation slot is reclaimed after this long if its holder never released it
+RATE_LIMIT_LEASE_SECONDS = 300
+RATE_LIMIT_KEY_PREFIX = "cvmaster:ratelimit:"
+
+_SLOT_POLL_INTERVAL = 0.25
+# Retry-After sent when a user's generations are all still running
+_BUSY_RETRY_AFTER = 5
+
+
+class RateLimited(Exception):
+    """Raised when a generation is over a rate or concurrency limit."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class RateLimitBackend:
+    """Interface for the shared state of the limiter."""
+
+    def take(self, buckets, count=1):
+        """Take `count` tokens from every (key, tokens_per_second, burst) bucket, or from none.
+
+        Returns 0 when the tokens were taken, otherwise the seconds until all of the
+        buckets will have them.
+        """
+        raise NotImplementedError
+
+    def acquire_slot(self, key, limit, lease_id, ttl):
+        """Hold one of `limit` slots under `key` for up to `ttl` seconds; False if all are held."""
+        raise NotImplementedError
+
+    def release_slot(self, key, lease_id):
+        raise NotImplementedError
+
+
+class LocalRateLimitBackend(RateLimitBackend):
+    """Limits within this process; with several workers each one enforces them separately."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._slots = {}
+
+    def take(self, buckets, count=1):
+        now = time.monotonic()
+        with self._lock:
+            levels, wait = [], 0.0
+            for key, rate, burst in buckets:
+                tokens, updated = self._buckets.get(key, (burst, now))
+                tokens = min(burst, tokens + (now - updated) * rate)
+                levels.append((key, tokens))
+                if tokens < count:
+                    wait = max(wait, (count - tokens) / rate)
+            if not wait:
+                for key, tokens in levels:
+                    self._buckets[key] = (tokens - count, now)
+            return wait
+
+    def acquire_slot(self, key, limit, lease_id, ttl):
+        now = time.monotonic()
+        with self._lock:
+            leases = {lease: expires for lease, expires in self._slots.get(key, {}).items() if expires > now}
+            if len(leases) >= limit:
+                self._slots[key] = leases
+                return False
+            leases[lease_id] = now + ttl
+            self._slots[key] = leases
+            return True
+
+    def release_slot(self, key, lease_id):
+        with self._lock:
+            leases = self._slots.get(key)
+            if leases is not None:
+                leases.pop(lease_id, None)
+                if not leases:
+                    del self._slots[key]
+
+
+# Buckets are hashes of (tokens, updated); time comes from the Redis server so every node agrees.
+# ARGV is each bucket's rate and burst, then the number of tokens to take.
+_TAKE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local count = tonumber(ARGV[#KEYS * 2 + 1])
+local levels, wait = {}, 0
+for i, key in ipairs(KEYS) do
+    local rate, burst = tonumber(ARGV[i * 2 - 1]), tonumber(ARGV[i * 2])
+    local bucket = redis.call('HMGET', key, 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or burst
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+    levels[i] = tokens
+    if tokens < count then
+        wait = math.max(wait, (count - tokens) / rate)
+    end
+end
+if wait == 0 then
+    for i, key in ipairs(KEYS) do
+        local rate, burst = tonumber(ARGV[i * 2 - 1]), tonumber(ARGV[i * 2])
+        redis.call('HSET', key, 'tokens', levels[i] - count, 'updated', now)
+        redis.call('EXPIRE', key, math.ceil(burst / rate) + 1)
+    end
+end
+return tostring(wait)
+"""
+
+# Slots are a sorted set of lease ids scored by expiry
+_ACQUIRE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Limits shared by every worker and node through Redis or a compatible server (Valkey, KeyDB, ...)."""
+
+    def __init__(self, url=RATE_LIMIT_REDIS_URL):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("The Redis rate limit backend requires redis. Install it with 'pip install redis'.")
+
+        self.client = redis.Redis.from_url(url)
+        self._take = self.client.register_script(_TAKE_SCRIPT)
+        self._acquire = self.client.register_script(_ACQUIRE_SCRIPT)
+
+    def take(self, buckets, count=1):
+        args = []
+        for _, rate, burst in buckets:
+            args += [rate, burst]
+        return float(self._take(keys=[key for key, _, _ in buckets], args=args + [count]))
+
+    def acquire_slot(self, key, limit, lease_id, ttl):
+        return bool(self._acquire(keys=[key], args=[limit, lease_id, ttl]))
+
+    def release_slot(self, key, lease_id):
+        self.client.zrem(key, lease_id)
+
+
+class Lease:
+    """A running generation's concurrency slot; release it when the generation ends."""
+
+    def __init__(self, limiter, key, lease_id):
+        self.limiter = limiter
+        self.key = key
+        self.id = lease_id
+        self.released = lease_id is None
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.limiter.backend.release_slot(self.key, self.id)
+
+
+class GenerationLimiter:
+    """Per-user and global token buckets, plus a cap on each user's running generations."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def _buckets(self, user_key):
+        buckets = []
+        if RATE_LIMIT_USER_PER_MINUTE:
+            buckets.append((f"{RATE_LIMIT_KEY_PREFIX}user:{user_key}", RATE_LIMIT_USER_PER_MINUTE / 60,
+                            RATE_LIMIT_USER_BURST))
+        if RATE_LIMIT_GLOBAL_PER_MINUTE:
+            buckets.append((f"{RATE_LIMIT_KEY_PREFIX}global", RATE_LIMIT_GLOBAL_PER_MINUTE / 60,
+                            RATE_LIMIT_GLOBAL_BURST))
+        return buckets
+
+    def _check_rate(self, user_key, count=1):
+        buckets = self._buckets(user_key)
+        for _, rate, burst in buckets:
+            if count > burst:
+                raise RateLimited(f"At most {burst} generations can be started at once.", burst / rate)
+        wait = self.backend.take(buckets, count) if buckets else 0
+        if wait:
+            raise RateLimited("Too many generations. Please wait a moment and try again.", wait)
+
+    def _try_slot(self, user_key):
+        if not RATE_LIMIT_USER_CONCURRENCY:
+            return Lease(self, None, None)
+        key = f"{RATE_LIMIT_KEY_PREFIX}slots:{user_key}"
+        lease_id = uuid.uuid4().hex
+        if self.backend.acquire_slot(key, RATE_LIMIT_USER_CONCURRENCY, lease_id, RATE_LIMIT_LEASE_SECONDS):
+            return Lease(self, key, lease_id)
+        return None
+
+    def _busy(self):
+        return RateLimited("You already have generations running. Please wait for them to finish.",
+                           _BUSY_RETRY_AFTER)
+
+    def _charge(self, user_key, leases, count=1):
+        """Take rate tokens for generations that already hold their slots, releasing the slots if refused.
+
+        Slots come first so a generation turned away for want of a slot is never charged.
+        """
+        try:
+            self._check_rate(user_key, count)
+        except RateLimited:
+            for lease in leases:
+                lease.release()
+            raise
+        return leases
+
+    def acquire_nowait(self, user_key):
+        """Admit a generation or raise RateLimited at once; for streams and background jobs."""
+        lease = self._try_slot(user_key)
+        if lease is None:
+            raise self._busy()
+        return self._charge(user_key, [lease])[0]
+
+    def acquire_batch_nowait(self, user_key, count):
+        """Admit `count` generations at once or raise RateLimited; for requests that fan out.
+
+        Each generation takes a rate token. Returns a lease per generation that may run
+        concurrently: as many of the user's free slots as there are, at least one.
+        """
+        if not RATE_LIMIT_USER_CONCURRENCY:
+            return self._charge(user_key, [Lease(self, None, None) for _ in range(count)], count)
+        leases = []
+        while len(leases) < count:
+            lease = self._try_slot(user_key)
+            if lease is None:
+                break
+            leases.append(lease)
+        if not leases:
+            raise self._busy()
+        return self._charge(user_key, leases, count)
+
+    async def acquire(self, user_key):
+        """Admit a generation, waiting up to RATE_LIMIT_QUEUE_SECONDS for a running one to finish."""
+        deadline = time.monotonic() + RATE_LIMIT_QUEUE_SECONDS
+        while True:
+            lease = self._try_slot(user_key)
+            if lease is not None:
+                return self._charge(user_key, [lease])[0]
+            if time.monotonic() >= deadline:
+                raise self._busy()
+            await asyncio.sleep(_SLOT_POLL_INTERVAL)
+
+    async def run(self, user_key, generation):
+        """Await `generation` within the user's limits; it is closed unrun if they reject it."""
+        try:
+            lease = await self.acquire(user_key)
+        except RateLimited:
+            if inspect.iscoroutine(generation):
+                generation.close()
+            raise
+        try:
+            return await generation
+        finally:
+            lease.release()
+
+
+_BACKENDS = {
+    "local": LocalRateLimitBackend,
+    "redis": RedisRateLimitBackend,
+}
+
+_limiter = None
+_lock = threading.Lock()
+
+
+def get_generation_limiter():
+    """Return the limiter on the configured backend (RATE_LIMIT_BACKEND=local|redis)."""
+    global _limiter
+    with _lock:
+        if _limiter is None:
+            if RATE_LIMIT_BACKEND not in _BACKENDS:
+                raise RuntimeError(f"Unknown rate limit backend: {RATE_LIMIT_BACKEND}")
+            _limiter = GenerationLimiter(_BACKENDS[RATE_LIMIT_BACKEND]())
+        return _limiter
@@ -0,0 +1,141 @@
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from disk_cache import DiskLRUCache
+
+load_dotenv()
+
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", os.path.join("cache", "responses.sqlite3"))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", str(24 * 60 * 60)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+RESPONSE_CACHE_MEMORY_ENTRIES = int(os.getenv("RESPONSE_CACHE_MEMORY_ENTRIES", "256"))
+
+_whitespace = re.compile(r"\s+")
+
+
+def normalize(value):
+    """Collapse whitespace so trivially different submissions share a cache entry."""
+    if isinstance(value, str):
+        return _whitespace.sub(" ", value).strip()
+    return value
+
+
+def response_key(generation):
+    spec = generation.spec
+    payload = {
+        "feature": spec.name,
+        "version": spec.version,
+        "model": spec.model,
+        "temperature": spec.temperature,
+        "resume": normalize(generation.resume_text),
+        "inputs": {name: normalize(value) for name, value in generation.inputs.items()},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class MemoryLRUCache:
+    """Small per-process LRU in front of the shared disk cache."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at=None):
+        with self._lock:
+            self._entries[key] = (value, expires_at or time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class ResponseCache:
+    def __init__(self, path=RESPONSE_CACHE_PATH, ttl=RESPONSE_CACHE_TTL, max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+                 memory_entries=RESPONSE_CACHE_MEMORY_ENTRIES):
+        self.memory = MemoryLRUCache(memory_entries, ttl)
+        self.disk = DiskLRUCache(path, max_entries=max_entries, ttl=ttl)
+
+    def get(self, key):
+        text = self.memory.get(key)
+        if text is None:
+            blob = self.disk.get(key)
+            if blob is not None:
+                text = blob.decode("utf-8")
+                self.memory.set(key, text)
+        return text
+
+    def set(self, key, text):
+        self.memory.set(key, text)
+        self.disk.set(key, text.encode("utf-8"))
+
+
+_cache = None
+_lock = threading.Lock()
+
+
+def get_response_cache():
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+
+async def _resolved(text):
+    return text
+
+
+async def _cache_when_done(cache, key, pending):
+    text = await pending
+    cache.set(key, text)
+    return text
+
+
+def response_cache_middleware(generation, call_next):
+    """Serve repeated generations from the cache; `bypass_cache` forces a fresh one and replaces the entry."""
+    cache = get_response_cache()
+    key = response_key(generation)
+
+    if not generation.options.get("bypass_cache"):
+        text = cache.get(key)
+        if text is not None:
+            if generation.asynchronous:
+                return _resolved(text)
+            return iter([text]) if generation.stream else text
+
+    result = call_next(generation)
+    if generation.asynchronous:
+        return _cache_when_done(cache, key, result)
+    if not generation.stream:
+        cache.set(key, result)
+        return result
+
+    def tee():
+        chunks = []
+        for chunk in result:
+            chunks.append(chunk)
+            yield chunk
+        # Only a completely delivered stream is worth caching
+        cache.set(key, "".join(chunks).strip())
+
+    return tee()
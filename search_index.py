@@ -0,0 +1,228 @@
+from collections import OrderedDict
+import fcntl
+import html
+import os
+import re
+import sqlite3
+import threading
+
+import faiss
+import numpy as np
+from dotenv import load_dotenv
+
+from embedding_cache import get_embeddings
+from faiss_store import get_text_chunks
+
+load_dotenv()
+
+SEARCH_INDEX_DIR = os.getenv("SEARCH_INDEX_DIR", "search_indices")
+SEARCH_RESULTS = int(os.getenv("SEARCH_RESULTS", "10"))
+
+# Vector ids are resume_id * MAX_CHUNKS_PER_RESUME + chunk number, so a resume's vectors form one id range
+MAX_CHUNKS_PER_RESUME = 10000
+
+# Reciprocal rank fusion constant; 60 is the usual choice
+RRF_K = 60
+# Loaded per-user indices kept in memory
+INDEX_CACHE_SIZE = 64
+SNIPPET_CHARS = 200
+
+os.makedirs(SEARCH_INDEX_DIR, exist_ok=True)
+
+_QUERY_TERM = re.compile(r"\w+")
+
+_conn = None
+_conn_lock = threading.Lock()
+_indices = OrderedDict()
+_indices_lock = threading.Lock()
+
+
+def _execute(sql, params=()):
+    """Run one statement on the shared full-text database and return its rows."""
+    global _conn
+    with _conn_lock:
+        if _conn is None:
+            _conn = sqlite3.connect(os.path.join(SEARCH_INDEX_DIR, "fts.sqlite3"), timeout=30,
+                                    check_same_thread=False, isolation_level=None)
+            _conn.execute("PRAGMA journal_mode=WAL")
+            _conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS resume_fts USING fts5("
+                "content, user_id UNINDEXED, resume_id UNINDEXED, tokenize='porter unicode61')"
+            )
+        return _conn.execute(sql, params).fetchall()
+
+
+def _index_path(user_id):
+    return os.path.join(SEARCH_INDEX_DIR, f"user_{user_id}.faiss")
+
+
+class _UserLock:
+    """Cross-process lock around read-modify-write of a user's vector index."""
+
+    def __init__(self, user_id):
+        self.path = os.path.join(SEARCH_INDEX_DIR, f"user_{user_id}.lock")
+
+    def __enter__(self):
+        self.file = open(self.path, "a")
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+def _load_index(user_id):
+    """Return the user's vector index, re-reading it only when another process has rewritten it."""
+    path = _index_path(user_id)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    with _indices_lock:
+        cached = _indices.get(user_id)
+        if cached and cached[0] == mtime:
+            _indices.move_to_end(user_id)
+            return cached[1]
+
+    index = faiss.read_index(path)
+    with _indices_lock:
+        _indices[user_id] = (mtime, index)
+        _indices.move_to_end(user_id)
+        while len(_indices) > INDEX_CACHE_SIZE:
+            _indices.popitem(last=False)
+    return index
+
+
+def _save_index(user_id, index):
+    path = _index_path(user_id)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _normalized(vectors):
+    vectors = np.asarray(vectors, dtype="float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def _id_range(resume_id):
+    return resume_id * MAX_CHUNKS_PER_RESUME, (resume_id + 1) * MAX_CHUNKS_PER_RESUME
+
+
+def has_index(user_id):
+    return os.path.exists(_index_path(user_id))
+
+
+def index_resume(user_id, resume_id, text):
+    """Add (or replace) a resume in its owner's search index.
+
+    Chunks are embedded through the shared embedding cache, so a resume already
+    embedded for analysis costs no model calls here.
+    """
+    chunks = get_text_chunks(text or "")[:MAX_CHUNKS_PER_RESUME]
+
+    _execute("DELETE FROM resume_fts WHERE resume_id = ?", (resume_id,))
+    _execute("INSERT INTO resume_fts (content, user_id, resume_id) VALUES (?, ?, ?)", (text or "", user_id, resume_id))
+
+    if not chunks:
+        return
+    vectors = _normalized(get_embeddings().embed_documents(chunks))
+    start, _ = _id_range(resume_id)
+    with _UserLock(user_id):
+        index = _load_index(user_id)
+        if index is None:
+            index = faiss.IndexIDMap2(faiss.IndexFlatIP(vectors.shape[1]))
+        else:
+            index = faiss.clone_index(index)
+            index.remove_ids(faiss.IDSelectorRange(*_id_range(resume_id)))
+        index.add_with_ids(vectors, np.arange(start, start + len(chunks), dtype="int64"))
+        _save_index(user_id, index)
+
+
+def remove_resume(user_id, resume_id):
+    """Drop a deleted resume from its owner's search index."""
+    _execute("DELETE FROM resume_fts WHERE resume_id = ?", (resume_id,))
+    with _UserLock(user_id):
+        index = _load_index(user_id)
+        if index is not None:
+            index = faiss.clone_index(index)
+            index.remove_ids(faiss.IDSelectorRange(*_id_range(resume_id)))
+            _save_index(user_id, index)
+
+
+def rebuild_user_index(user_id, resumes):
+    """Index all of a user's resumes from scratch, e.g. for libraries uploaded before search existed."""
+    _execute("DELETE FROM resume_fts WHERE user_id = ?", (user_id,))
+    try:
+        os.remove(_index_path(user_id))
+    except FileNotFoundError:
+        pass
+    for resume in resumes:
+        index_resume(user_id, resume.id, resume.extracted_text)
+
+
+def _keyword_hits(user_id, query, limit):
+    terms = _QUERY_TERM.findall(query)
+    if not terms:
+        return []
+    # Any term may match; BM25 ranks resumes matching more of them higher
+    match = " OR ".join(f'"{term}"' for term in terms)
+    rows = _execute(
+        "SELECT resume_id, snippet(resume_fts, 0, char(2), char(3), '...', 24) FROM resume_fts "
+        "WHERE resume_fts MATCH ? AND user_id = ? ORDER BY rank LIMIT ?",
+        (match, user_id, limit)
+    )
+    # Mark matches only after escaping the resume text around them
+    return [(resume_id, html.escape(snippet).replace("\x02", "<mark>").replace("\x03", "</mark>"))
+            for resume_id, snippet in rows]
+
+
+def _chunk_snippet(resume_id, chunk):
+    rows = _execute("SELECT content FROM resume_fts WHERE resume_id = ?", (resume_id,))
+    chunks = get_text_chunks(rows[0][0]) if rows else []
+    return html.escape(chunks[chunk][:SNIPPET_CHARS]) if chunk < len(chunks) else ""
+
+
+def _vector_hits(user_id, query, limit):
+    """Best chunk per resume for the query, as (resume_id, chunk number, similarity), best first."""
+    index = _load_index(user_id)
+    if index is None or index.ntotal == 0:
+        return []
+    vector = _normalized([get_embeddings().embed_query(query)])
+    scores, ids = index.search(vector, min(index.ntotal, limit * 5))
+
+    best = {}
+    for score, vector_id in zip(scores[0], ids[0]):
+        if vector_id < 0:
+            continue
+        resume_id, chunk = divmod(int(vector_id), MAX_CHUNKS_PER_RESUME)
+        if resume_id not in best:
+            best[resume_id] = (resume_id, chunk, float(score))
+    return list(best.values())[:limit]
+
+
+def search(user_id, query, limit=SEARCH_RESULTS):
+    """Rank a user's resumes for a query by fusing keyword (FTS5 BM25) and vector rankings.
+
+    Returns dicts with resume_id, score, an HTML snippet (matches wrapped in
+    <mark>) and which rankings matched, best first.
+    """
+    keyword = _keyword_hits(user_id, query, limit * 2)
+    vector = _vector_hits(user_id, query, limit * 2)
+
+    hits = {}
+    for rank, (resume_id, snippet) in enumerate(keyword):
+        hits[resume_id] = {"resume_id": resume_id, "score": 1 / (RRF_K + rank + 1), "snippet": snippet,
+                           "keyword": True, "semantic": False}
+    for rank, (resume_id, chunk, similarity) in enumerate(vector):
+        hit = hits.setdefault(resume_id, {"resume_id": resume_id, "score": 0.0, "snippet": None,
+                                          "keyword": False, "semantic": True})
+        hit["score"] += 1 / (RRF_K + rank + 1)
+        hit["semantic"] = True
+        if hit["snippet"] is None:
+            hit["snippet"] = _chunk_snippet(resume_id, chunk)
+
+    return sorted(hits.values(), key=lambda hit: hit["score"], reverse=True)[:limit]
@@ -0,0 +1,281 @@
+import asyncio
+from concurrent.futures import CancelledError, Future
+import os
+import threading
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, make_url, text
+
+from response_cache import response_key
+
+load_dotenv()
+
+# Also coalesce identical generations across worker processes, through Postgres advisory locks
+SINGLE_FLIGHT_DB_LOCK = os.getenv("SINGLE_FLIGHT_DB_LOCK", "0") == "1"
+SINGLE_FLIGHT_DATABASE_URL = os.getenv("SINGLE_FLIGHT_DATABASE_URL") or os.getenv("DATABASE_URL")
+# Connections for generations holding or waiting on a lock; when all are busy, generations skip the lock
+SINGLE_FLIGHT_DB_POOL = int(os.getenv("SINGLE_FLIGHT_DB_POOL", "10"))
+# Longest a generation waits for another process's identical one before running its own
+SINGLE_FLIGHT_LOCK_TIMEOUT = int(os.getenv("SINGLE_FLIGHT_LOCK_TIMEOUT", "120"))
+
+_inflight = {}
+_streams = {}
+_lock = threading.Lock()
+# Readers of every shared stream wait on this; it shares _lock so joining and leaving are atomic
+_stream_changed = threading.Condition(_lock)
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def _get_engine():
+    """Engine for the advisory locks, or None when the database can't provide them."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            backend = make_url(SINGLE_FLIGHT_DATABASE_URL).get_backend_name()
+            if backend == "postgresql":
+                _engine = create_engine(SINGLE_FLIGHT_DATABASE_URL, pool_size=SINGLE_FLIGHT_DB_POOL,
+                                        max_overflow=0, pool_timeout=1)
+            else:
+                print(f"Single-flight advisory locks need PostgreSQL, not {backend}; "
+                      f"coalescing within each process only.")
+                _engine = False
+        return _engine or None
+
+
+class ProcessLock:
+    """Transaction-level Postgres advisory lock on a generation key, held while it runs.
+
+    A failure to lock (no free connection, timeout, database down) is logged and the
+    generation runs anyway: the lock only saves duplicate spend.
+    """
+
+    def __init__(self, key):
+        self.lock_id = int.from_bytes(bytes.fromhex(key[:16]), "big", signed=True)
+        self.connection = None
+        self.waited = False
+
+    def acquire(self):
+        engine = _get_engine()
+        if engine is None:
+            return self
+        try:
+            connection = engine.connect()
+        except Exception as e:
+            print(f"Single-flight lock skipped: {e}")
+            return self
+        try:
+            connection.begin()
+            if not connection.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": self.lock_id}).scalar():
+                self.waited = True
+                connection.execute(text(f"SET LOCAL lock_timeout = '{SINGLE_FLIGHT_LOCK_TIMEOUT}s'"))
+                connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": self.lock_id})
+            self.connection = connection
+        except Exception as e:
+            print(f"Single-flight lock skipped: {e}")
+            connection.close()
+        return self
+
+    def release(self):
+        if self.connection is not None:
+            # Ending the transaction releases the lock
+            self.connection.rollback()
+            self.connection.close()
+            self.connection = None
+
+
+def _lead(key):
+    """Return (future, True) to run the generation for `key`, or (in-flight future, False) to await it."""
+    with _lock:
+        shared = _inflight.get(key)
+        if shared is None:
+            shared = _inflight[key] = Future()
+            return shared, True
+        return shared, False
+
+
+def _finish(key, shared):
+    with _lock:
+        if _inflight.get(key) is shared:
+            del _inflight[key]
+
+
+def _after_other_process(generation, lock):
+    # Another process just made this generation and left it in the response cache
+    if lock.waited:
+        generation.options = dict(generation.options, bypass_cache=False)
+
+
+def _join(key, generation, call_next):
+    while True:
+        shared, leader = _lead(key)
+        if leader:
+            break
+        try:
+            return shared.result()
+        except CancelledError:
+            if not shared.cancelled():
+                raise
+
+    lock = ProcessLock(key).acquire() if SINGLE_FLIGHT_DB_LOCK else None
+    try:
+        if lock is not None:
+            _after_other_process(generation, lock)
+        result = call_next(generation)
+    except Exception as e:
+        shared.set_exception(e)
+        raise
+    except BaseException:
+        shared.cancel()
+        raise
+    else:
+        shared.set_result(result)
+        return result
+    finally:
+        _finish(key, shared)
+        if lock is not None:
+            lock.release()
+
+
+async def _ajoin(key, generation, call_next):
+    while True:
+        shared, leader = _lead(key)
+        if leader:
+            break
+        try:
+            # Shielded so a follower going away doesn't cancel the generation for everyone else
+            return await asyncio.shield(asyncio.wrap_future(shared))
+        except asyncio.CancelledError:
+            # The leading request was cancelled; take over unless this one was too
+            if not shared.cancelled() or asyncio.current_task().cancelling():
+                raise
+
+    lock = None
+    try:
+        if SINGLE_FLIGHT_DB_LOCK:
+            lock = await asyncio.to_thread(ProcessLock(key).acquire)
+            _after_other_process(generation, lock)
+        result = await call_next(generation)
+    except Exception as e:
+        shared.set_exception(e)
+        raise
+    except BaseException:
+        shared.cancel()
+        raise
+    else:
+        shared.set_result(result)
+        return result
+    finally:
+        _finish(key, shared)
+        if lock is not None:
+            lock.release()
+
+
+class SharedStream:
+    """One streamed generation, replayed to every identical stream that joins while it runs.
+
+    Whichever reader first needs a chunk nobody has produced yet pulls it from the
+    model, so the stream carries on when the request that started it disconnects.
+    If every reader leaves early, the model stream is closed.
+    """
+
+    def __init__(self, key, start):
+        self.key = key
+        self._start = start
+        self._upstream = None
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.readers = 0
+        self._pulling = False
+
+    def _pull(self):
+        try:
+            if self._upstream is None:
+                self._upstream = iter(self._start())
+            chunk = next(self._upstream)
+        except StopIteration:
+            self._end()
+        except BaseException as e:
+            self._end(e)
+            raise
+        else:
+            with _stream_changed:
+                self.chunks.append(chunk)
+                self._pulling = False
+                _stream_changed.notify_all()
+
+    def _end(self, error=None):
+        with _stream_changed:
+            self.done = True
+            self.error = error
+            self._pulling = False
+            if _streams.get(self.key) is self:
+                del _streams[self.key]
+            _stream_changed.notify_all()
+
+    def read(self):
+        """Yield every chunk of the stream from the start; call with the reader already counted."""
+        position = 0
+        try:
+            while True:
+                with _stream_changed:
+                    while position >= len(self.chunks) and not self.done and self._pulling:
+                        _stream_changed.wait()
+                    buffered = position < len(self.chunks)
+                    if buffered:
+                        chunk = self.chunks[position]
+                    elif self.done:
+                        if self.error is not None:
+                            raise self.error
+                        return
+                    else:
+                        self._pulling = True
+
+                if not buffered:
+                    self._pull()
+                    continue
+                position += 1
+                yield chunk
+        finally:
+            self._leave()
+
+    def _leave(self):
+        with _stream_changed:
+            self.readers -= 1
+            abandoned = self.readers == 0 and not self.done
+            if abandoned:
+                self.done = True
+                if _streams.get(self.key) is self:
+                    del _streams[self.key]
+        if abandoned and self._upstream is not None:
+            self._upstream.close()
+
+
+def _stream(key, generation, call_next):
+    with _stream_changed:
+        shared = _streams.get(key)
+        if shared is None:
+            shared = _streams[key] = SharedStream(key, lambda: call_next(generation))
+        shared.readers += 1
+    yield from shared.read()
+
+
+def single_flight_middleware(generation, call_next):
+    """Make concurrent identical generations share one model call.
+
+    Generations are identical when they have the same response cache key (feature,
+    prompt version, model, resume text and inputs). The first one runs and the others
+    in this process wait for its result, whichever thread or event loop they are on.
+    With SINGLE_FLIGHT_DB_LOCK=1 a Postgres advisory lock extends this to every process
+    sharing the database: a process that had to wait takes the result from the
+    response cache, so this must run outside the cache middleware. Identical streams
+    share one model stream within a process, each reader receiving every chunk.
+    """
+    key = response_key(generation)
+    if generation.stream:
+        return _stream(key, generation, call_next)
+    if generation.asynchronous:
+        return _ajoin(key, generation, call_next)
+    return _join(key, generation, call_next)
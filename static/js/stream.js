@@ -0,0 +1,65 @@
+// Readers for the /stream endpoints, so generation pages fill in while the model writes
+
+// Fetch a streaming endpoint and call onText with all the text received so far after every chunk.
+// A POST is sent when `body` is given. With `events`, the response is read as Server-Sent Events
+// and the data of its final `done` event is returned; it is null if the stream broke off first.
+async function readStream(url, body, onText, events) {
+    const response = await fetch(url, {
+        method: body ? 'POST' : 'GET',
+        body: body,
+        headers: events ? { 'Accept': 'text/event-stream' } : {}
+    });
+    if (!response.ok || !response.body) {
+        const error = new Error(await response.text());
+        error.status = response.status;
+        throw error;
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let text = '';
+    let pending = '';
+    let done = null;
+
+    function handleEvent(block) {
+        let name = 'message';
+        let data = '';
+        block.split('\n').forEach(function(line) {
+            if (line.startsWith('event: ')) name = line.slice(7);
+            else if (line.startsWith('data: ')) data += line.slice(6);
+        });
+        if (!data) return;
+        if (name === 'done') {
+            done = JSON.parse(data);
+        } else {
+            text += JSON.parse(data);
+            onText(text);
+        }
+    }
+
+    while (true) {
+        const { done: finished, value } = await reader.read();
+        const chunk = finished ? decoder.decode() : decoder.decode(value, { stream: true });
+        if (!events) {
+            text += chunk;
+            onText(text);
+        } else {
+            pending += chunk;
+            const blocks = pending.split('\n\n');
+            pending = blocks.pop();
+            blocks.forEach(handleEvent);
+        }
+        if (finished) break;
+    }
+    return events ? done : text;
+}
+
+// Render a chunked HTML response into `target`; a rejected request shows the server's message
+async function streamInto(target, url, body) {
+    try {
+        await readStream(url, body, function(text) { target.innerHTML = text; });
+    } catch (error) {
+        if (error.status === undefined) throw error;
+        target.textContent = error.message;
+    }
+}
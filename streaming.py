@@ -0,0 +1,69 @@
+import json
+
+
+class LineFilter:
+    """Incremental version of the post-processing applied to finished generations.
+
+    Tokens are buffered until a full line is available; each line is stripped and
+    dropped if an identical line was already emitted, matching remove_duplicate_lines.
+    """
+
+    def __init__(self, dedupe=True, replace_asterisks=False):
+        self.dedupe = dedupe
+        self.replace_asterisks = replace_asterisks
+        self._buffer = ""
+        self._seen = set()
+        self._emitted_any = False
+
+    def _emit(self, line):
+        line = line.strip() if self.dedupe else line
+        if self.dedupe:
+            if line in self._seen:
+                return ""
+            self._seen.add(line)
+
+        # Lines are re-joined with "\n", so every line after the first carries its separator
+        out = line if not self._emitted_any else "\n" + line
+        self._emitted_any = True
+        return out
+
+    def feed(self, chunk):
+        """Add a chunk of model output and return whatever text is now final."""
+        if self.replace_asterisks:
+            chunk = chunk.replace("*", "\"")
+        self._buffer += chunk
+
+        *lines, self._buffer = self._buffer.split("\n")
+        return "".join(self._emit(line) for line in lines)
+
+    def flush(self):
+        """Return the trailing partial line once the model has finished."""
+        line, self._buffer = self._buffer, ""
+        return self._emit(line)
+
+
+def filter_stream(chunks, dedupe=True, replace_asterisks=False):
+    """Apply a LineFilter to an iterable of text chunks, skipping empty output."""
+    line_filter = LineFilter(dedupe=dedupe, replace_asterisks=replace_asterisks)
+    for chunk in chunks:
+        text = line_filter.feed(chunk)
+        if text:
+            yield text
+    text = line_filter.flush()
+    if text:
+        yield text
+
+
+def join_documents(docs):
+    """Build the prompt context the way the "stuff" QA chain does."""
+    return "\n\n".join(doc.page_content for doc in docs)
+
+
+def sse_events(chunks, done=None):
+    """Wrap text chunks as Server-Sent Events, ending with a `done` event.
+
+    `done`, if given, is called once the chunks are exhausted and its dict becomes the event's data.
+    """
+    for chunk in chunks:
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield f"event: done\ndata: {json.dumps(done() if done else {})}\n\n"
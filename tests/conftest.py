@@ -0,0 +1,88 @@
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+EMAIL = "test@example.com"
+PASSWORD = "test-password"
+
+_resumes = itertools.count(1000)
+
+# Settings are read when modules are first imported, which for some is while tests are collected.
+# Caches, indices and blobs live relative to the working directory, so it is a scratch one
+WORKDIR = tempfile.mkdtemp(prefix="cvmaster_tests_")
+os.chdir(WORKDIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'test.db')}"
+os.environ["GOOGLE_API_KEY"] = "offline"
+# One user sends every request; tests of the limits configure their own limiter
+for name in ("RATE_LIMIT_USER_PER_MINUTE", "RATE_LIMIT_GLOBAL_PER_MINUTE", "RATE_LIMIT_USER_CONCURRENCY"):
+    os.environ[name] = "0"
+
+
+@pytest.fixture(scope="session")
+def app():
+    """The Flask app on an SQLite database in a scratch directory, with the fake Gemini models."""
+    from fake_gemini import FakeGeminiConfig, install
+    install(FakeGeminiConfig(latency=0, token_rate=0, embed_latency=0))
+    from app import app, db, User
+
+    app.config["WTF_CSRF_ENABLED"] = False
+    with app.app_context():
+        db.create_all()
+        user = User(username="test", email=EMAIL)
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+    return app
+
+
+def login(app):
+    """A test client signed in as the test user; each thread needs its own."""
+    client = app.test_client()
+    client.post("/login", data={"email": EMAIL, "password": PASSWORD})
+    return client
+
+
+@pytest.fixture
+def client(app):
+    return login(app)
+
+
+@pytest.fixture
+def resume_id(app, client):
+    """A freshly uploaded resume, with text no other test has cached a response for."""
+    from app import Resume
+    from bench_routes import upload
+
+    n = next(_resumes)
+    upload(client, n, 1)
+    with app.app_context():
+        return Resume.query.filter_by(candidate_name=f"Candidate {n}").one().id
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    """Configure the fake Gemini chat model; the returned list counts its completions."""
+    import fake_gemini
+
+    calls = []
+    prepare = fake_gemini.FakeGeminiChat._prepare
+
+    def counting(self, messages):
+        calls.append(messages)
+        return prepare(self, messages)
+
+    monkeypatch.setattr(fake_gemini.FakeGeminiChat, "_prepare", counting)
+
+    def configure(**settings):
+        fake_gemini.install(fake_gemini.FakeGeminiConfig(**dict(dict(token_rate=0, embed_latency=0), **settings)))
+        return calls
+
+    yield configure
+    fake_gemini.install(fake_gemini.FakeGeminiConfig(latency=0, token_rate=0, embed_latency=0))
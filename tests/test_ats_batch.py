@@ -0,0 +1,21 @@
+import pytest
+
+JOB = "Backend engineer\nPython, Kubernetes, AWS and PostgreSQL; experience with Terraform and Redis."
+
+
+@pytest.mark.parametrize("narratives", ["two", [1], -1, {"n": 1}])
+def test_batch_rejects_invalid_narratives(client, resume_id, narratives):
+    response = client.post("/ats_analysis/batch", json={"resume_ids": [resume_id], "job_descriptions": [JOB],
+                                                        "narratives": narratives})
+
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
+
+
+def test_batch_ranks_without_narratives(client, resume_id):
+    response = client.post("/ats_analysis/batch", json={"resume_ids": [resume_id], "job_descriptions": [JOB],
+                                                        "narratives": "0"})
+
+    assert response.status_code == 200
+    [row] = response.get_json()["results"]
+    assert row["resume_id"] == resume_id
@@ -0,0 +1,59 @@
+import math
+
+from ats_batch import score_matrix
+from ats_score import TextProfile, resume_profile, score_profiles
+
+RESUMES = [
+    TextProfile("Backend engineer. Python, Flask, PostgreSQL and Docker; deployed services on Kubernetes and AWS. "
+                "Led a team of five, mentoring juniors and owning the delivery of payment services."),
+    TextProfile("Data scientist with Python, pandas and scikit-learn. Built forecasting models and dashboards "
+                "for the finance team; presented results to stakeholders every quarter."),
+    resume_profile("Frontend developer building accessible interfaces in React and TypeScript.",
+                   {"skills": ["JavaScript", "CSS", "Figma"]}),
+    TextProfile(""),
+]
+
+JOBS = [
+    TextProfile("Senior backend engineer: Python, Flask, PostgreSQL, Docker, Kubernetes. You will own payment "
+                "services, mentor engineers and improve delivery. Python experience essential."),
+    TextProfile("Frontend engineer with React, TypeScript and CSS to build accessible, fast interfaces."),
+    # Keywords but no skills from the vocabulary
+    TextProfile("Keen writer who enjoys planning and presenting quarterly reports to customers."),
+    # Skills but no other keywords
+    TextProfile("Python Docker"),
+    # Neither
+    TextProfile(""),
+]
+
+
+def as_optional(value):
+    return None if math.isnan(value) else int(value)
+
+
+def test_matrix_matches_pairwise_scores():
+    score, skill_score, keyword_score = score_matrix(RESUMES, JOBS)
+
+    assert score.shape == skill_score.shape == keyword_score.shape == (len(JOBS), len(RESUMES))
+    for j, job in enumerate(JOBS):
+        for r, resume in enumerate(RESUMES):
+            expected = score_profiles(resume, job)
+            assert int(score[j, r]) == expected["score"], (j, r)
+            assert as_optional(skill_score[j, r]) == expected["skill_score"], (j, r)
+            assert as_optional(keyword_score[j, r]) == expected["keyword_score"], (j, r)
+
+
+def test_matrix_exercises_every_component_case():
+    _, skill_score, keyword_score = score_matrix(RESUMES, JOBS)
+
+    # Guard against the fixtures drifting into a case the comparison above no longer covers
+    assert math.isnan(skill_score[2, 0]) and not math.isnan(keyword_score[2, 0])
+    assert not math.isnan(skill_score[3, 0]) and math.isnan(keyword_score[3, 0])
+    assert math.isnan(skill_score[4, 0]) and math.isnan(keyword_score[4, 0])
+    assert 0 < skill_score[0, 0] <= 100 and skill_score[0, 3] == 0
+
+
+def test_single_pair_matrix():
+    score, _, _ = score_matrix(RESUMES[:1], JOBS[:1])
+
+    assert score.shape == (1, 1)
+    assert int(score[0, 0]) == score_profiles(RESUMES[0], JOBS[0])["score"]
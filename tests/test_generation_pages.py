@@ -0,0 +1,89 @@
+import json
+import threading
+
+import pytest
+
+from conftest import login
+
+SSE = {"Accept": "text/event-stream"}
+
+
+def read_events(response):
+    """Split a Server-Sent Events body into (text, done event data)."""
+    text, done = "", None
+    for block in response.get_data(as_text=True).split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n") if ": " in line)
+        if lines.get("event") == "done":
+            done = json.loads(lines["data"])
+        elif "data" in lines:
+            text += json.loads(lines["data"])
+    return text, done
+
+
+def versions(app, resume_id, feature="roast"):
+    from app import GenerationResult
+    with app.app_context():
+        return [(result.version, result.content) for result in
+                GenerationResult.query.filter_by(resume_id=resume_id, feature=feature)
+                .order_by(GenerationResult.version)]
+
+
+def test_first_view_page_streams_instead_of_generating(app, client, resume_id, fake_model):
+    calls = fake_model(latency=0)
+    page = client.get(f"/roast/{resume_id}").get_data(as_text=True)
+
+    assert "Generating" in page
+    assert f"/roast/{resume_id}/stream" in page
+    assert calls == []
+
+
+def test_concurrent_first_view_streams_share_one_call_and_version(app, resume_id, fake_model):
+    calls = fake_model(latency=0.3)
+    responses = []
+
+    def open_tab():
+        response = login(app).get(f"/roast/{resume_id}/stream", headers=SSE, buffered=True)
+        responses.append(read_events(response))
+
+    tabs = [threading.Thread(target=open_tab) for _ in range(3)]
+    for tab in tabs:
+        tab.start()
+    for tab in tabs:
+        tab.join()
+
+    assert len(calls) == 1
+    assert len(responses) == 3
+    assert len({text for text, _ in responses}) == 1
+    assert {done["version"] for _, done in responses} == {1}
+    assert versions(app, resume_id) == [(1, responses[0][0])]
+
+
+def test_stream_get_sends_the_stored_version(app, client, resume_id, fake_model):
+    calls = fake_model(latency=0)
+    first, done = read_events(client.get(f"/feedback/{resume_id}/stream", headers=SSE))
+    # A query string no longer regenerates; only a POST does
+    again, done_again = read_events(client.get(f"/feedback/{resume_id}/stream?regenerate=1", headers=SSE))
+
+    assert len(calls) == 1
+    assert again == first
+    assert done_again == done
+
+
+def test_stream_post_regenerates(app, client, resume_id, fake_model):
+    calls = fake_model(latency=0)
+    client.get(f"/roast/{resume_id}/stream", headers=SSE)
+    _, done = read_events(client.post(f"/roast/{resume_id}/stream", headers=SSE))
+
+    assert len(calls) == 2
+    # The fake model repeats itself for the same prompt, so the regeneration adds no copy
+    assert done["version"] == 1
+    assert [version for version, _ in versions(app, resume_id)] == [1]
+
+
+@pytest.mark.parametrize("url", ["/ats_analysis", "/cover_letter"])
+def test_streaming_forms_load_the_shared_reader_once(client, url):
+    page = client.get(url).get_data(as_text=True)
+
+    # Loaded twice, the ATS page would stream every narrative twice
+    assert page.count("js/stream.js") == 1
+    assert "function streamInto" not in page
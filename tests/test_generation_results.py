@@ -0,0 +1,71 @@
+import pytest
+
+import app as app_module
+from app import db, store_result, GenerationResult
+from roast import ROAST_PROMPT
+
+
+def stored(resume_id):
+    return [(result.version, result.status, result.content) for result in
+            GenerationResult.query.filter_by(resume_id=resume_id, feature=ROAST_PROMPT.name)
+            .order_by(GenerationResult.version)]
+
+
+@pytest.fixture
+def context(app):
+    with app.app_context():
+        yield
+
+
+def test_versions_count_up(context, resume_id):
+    first = store_result(resume_id, ROAST_PROMPT, "first")
+    second = store_result(resume_id, ROAST_PROMPT, "second")
+
+    assert (first.version, second.version) == (1, 2)
+    assert second.model == ROAST_PROMPT.model
+    assert second.prompt_version == ROAST_PROMPT.version
+    assert stored(resume_id) == [(1, "draft", "first"), (2, "draft", "second")]
+
+
+def test_identical_content_returns_the_newest_draft(context, resume_id):
+    first = store_result(resume_id, ROAST_PROMPT, "same")
+
+    assert store_result(resume_id, ROAST_PROMPT, "same").id == first.id
+    assert stored(resume_id) == [(1, "draft", "same")]
+
+
+def test_identical_content_after_a_saved_version_is_a_new_draft(context, resume_id):
+    first = store_result(resume_id, ROAST_PROMPT, "same")
+    first.status = "saved"
+    db.session.commit()
+
+    assert store_result(resume_id, ROAST_PROMPT, "same").version == 2
+
+
+def test_explicit_version_taken_returns_the_stored_row(context, resume_id):
+    first = store_result(resume_id, ROAST_PROMPT, "first", version=1)
+    again = store_result(resume_id, ROAST_PROMPT, "another request's text", version=1)
+
+    assert again.id == first.id
+    assert stored(resume_id) == [(1, "draft", "first")]
+
+
+def test_old_drafts_are_pruned(context, resume_id, monkeypatch):
+    monkeypatch.setattr(app_module, "GENERATION_DRAFTS_KEPT", 2)
+    for n in range(1, 5):
+        store_result(resume_id, ROAST_PROMPT, f"draft {n}")
+
+    assert stored(resume_id) == [(3, "draft", "draft 3"), (4, "draft", "draft 4")]
+    # Numbering carries on from the newest version, not the count kept
+    assert store_result(resume_id, ROAST_PROMPT, "draft 5").version == 5
+
+
+def test_saved_versions_are_never_pruned(context, resume_id, monkeypatch):
+    monkeypatch.setattr(app_module, "GENERATION_DRAFTS_KEPT", 1)
+    saved = store_result(resume_id, ROAST_PROMPT, "keeper")
+    saved.status = "saved"
+    db.session.commit()
+    for n in range(2, 5):
+        store_result(resume_id, ROAST_PROMPT, f"draft {n}")
+
+    assert stored(resume_id) == [(1, "saved", "keeper"), (4, "draft", "draft 4")]
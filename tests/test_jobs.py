@@ -0,0 +1,76 @@
+import threading
+import time
+
+from jobs import DONE, FAILED, QUEUED, RUNNING, LocalJobBackend, QueueFull
+
+import pytest
+
+
+def test_wait_returns_on_every_status_change():
+    backend = LocalJobBackend(max_workers=1)
+    release = threading.Event()
+    job = backend.submit("roast", release.wait, args=(5,))
+
+    started = time.monotonic()
+    assert backend.wait(job.id, timeout=5, status=QUEUED).status == RUNNING
+    assert backend.wait(job.id, timeout=0.05, status=RUNNING).status == RUNNING
+    release.set()
+    assert backend.wait(job.id, timeout=5, status=RUNNING).status == DONE
+    assert time.monotonic() - started < 1
+    backend.shutdown()
+
+
+def test_failed_job_keeps_its_error():
+    def fail():
+        raise ValueError("bad input")
+
+    backend = LocalJobBackend(max_workers=1)
+    job = backend.wait(backend.submit("roast", fail).id, timeout=5)
+
+    assert job.status == FAILED
+    assert job.error == "bad input"
+    backend.shutdown()
+
+
+def test_coroutine_jobs_run_on_their_own_loop():
+    async def generate(text):
+        return text.upper()
+
+    backend = LocalJobBackend(max_workers=1)
+    job = backend.wait(backend.submit("roast", generate, args=("roast",)).id, timeout=5)
+
+    assert job.to_dict()["result"] == "ROAST"
+    backend.shutdown()
+
+
+def test_queue_full():
+    backend = LocalJobBackend(max_workers=1, max_pending=1)
+    release = threading.Event()
+    backend.submit("roast", release.wait, args=(5,))
+
+    with pytest.raises(QueueFull):
+        backend.submit("roast", release.wait, args=(5,))
+    release.set()
+    backend.shutdown()
+
+
+def test_every_status_change_is_reported():
+    seen = []
+    backend = LocalJobBackend(max_workers=1, on_update=lambda job: seen.append(job.status))
+    backend.wait(backend.submit("roast", lambda: "text").id, timeout=5)
+    backend.shutdown()
+
+    assert seen == [QUEUED, RUNNING, DONE]
+
+
+def test_job_events_push_the_running_status(client, resume_id, fake_model):
+    fake_model(latency=0.3)
+    job_id = client.post(f"/jobs/roast/{resume_id}").get_json()["job_id"]
+    body = client.get(f"/jobs/{job_id}/events").get_data(as_text=True)
+
+    assert '"status": "running"' in body
+    assert body.rstrip().split("\n")[-2] == "event: done"
+
+
+def test_job_events_unknown_job(client):
+    assert client.get("/jobs/missing/events").status_code == 404
@@ -0,0 +1,50 @@
+import time
+
+import profiling
+from profiling import _Sampler
+
+
+def test_recording_starts_at_once_without_delay():
+    sampler = _Sampler(0.005)
+    recording = sampler.start()
+    time.sleep(0.05)
+
+    assert recording.position is not None
+    assert sampler.stop(recording)
+
+
+def test_fast_request_never_wakes_the_sampler():
+    sampler = _Sampler(0.005)
+    recording = sampler.start(delay=0.5)
+    time.sleep(0.05)
+
+    assert recording.position is None
+    assert sampler.stop(recording) == []
+    assert not sampler._ticks and not sampler._pending
+
+
+def test_slow_request_is_recorded_once_armed():
+    sampler = _Sampler(0.005)
+    recording = sampler.start(delay=0.05)
+    time.sleep(0.2)
+
+    assert recording.position is not None
+    ticks = sampler.stop(recording)
+    # Roughly the 0.15 s after arming, not the whole 0.2 s
+    assert 0 < len(ticks) < 0.2 / 0.005
+    assert not sampler._active
+
+
+def test_unsampled_requests_are_armed_after_the_slow_delay(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 0)
+    monkeypatch.setattr(profiling, "PROFILE_SLOW_SECONDS", 10)
+    monkeypatch.setattr(profiling, "PROFILE_SLOW_ARM_SECONDS", 5)
+    monkeypatch.setattr(profiling, "_sampler", _Sampler(0.005))
+
+    profile = profiling.start_profile("GET", "/home")
+    time.sleep(0.05)
+
+    assert profile.recording.position is None
+    profiling.finish_profile(profile, "home")
+    assert not profiling._sampler._pending
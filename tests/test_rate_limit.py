@@ -0,0 +1,161 @@
+import asyncio
+
+import pytest
+
+import rate_limit
+from rate_limit import GenerationLimiter, LocalRateLimitBackend, RateLimited
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    """Set the limiter's settings for one test; returns a fresh limiter on the local backend."""
+
+    def configure(per_minute=60, burst=2, global_per_minute=0, global_burst=10, concurrency=1, queue_seconds=0.5):
+        monkeypatch.setattr(rate_limit, "RATE_LIMIT_USER_PER_MINUTE", per_minute)
+        monkeypatch.setattr(rate_limit, "RATE_LIMIT_USER_BURST", burst)
+        monkeypatch.setattr(rate_limit, "RATE_LIMIT_GLOBAL_PER_MINUTE", global_per_minute)
+        monkeypatch.setattr(rate_limit, "RATE_LIMIT_GLOBAL_BURST", global_burst)
+        monkeypatch.setattr(rate_limit, "RATE_LIMIT_USER_CONCURRENCY", concurrency)
+        monkeypatch.setattr(rate_limit, "RATE_LIMIT_QUEUE_SECONDS", queue_seconds)
+        monkeypatch.setattr(rate_limit, "_SLOT_POLL_INTERVAL", 0.01)
+        return GenerationLimiter(LocalRateLimitBackend())
+
+    return configure
+
+
+def test_burst_then_rate_limited(limits):
+    limiter = limits(per_minute=1, burst=2, concurrency=0)
+    limiter.acquire_nowait("user:1")
+    limiter.acquire_nowait("user:1")
+
+    with pytest.raises(RateLimited) as rejected:
+        limiter.acquire_nowait("user:1")
+    # One token a minute
+    assert 1 <= rejected.value.retry_after <= 60
+    # Other users have their own bucket
+    limiter.acquire_nowait("user:2")
+
+
+def test_global_bucket_is_shared_by_every_user(limits):
+    limiter = limits(per_minute=0, global_per_minute=1, global_burst=2, concurrency=0)
+    limiter.acquire_nowait("user:1")
+    limiter.acquire_nowait("user:2")
+
+    with pytest.raises(RateLimited):
+        limiter.acquire_nowait("user:3")
+
+
+def test_concurrency_cap_until_release(limits):
+    limiter = limits(per_minute=0, concurrency=1)
+    lease = limiter.acquire_nowait("user:1")
+
+    with pytest.raises(RateLimited, match="already have generations running"):
+        limiter.acquire_nowait("user:1")
+    lease.release()
+    lease.release()  # Releasing twice is harmless
+    limiter.acquire_nowait("user:1").release()
+
+
+def test_refused_slot_does_not_spend_a_rate_token(limits):
+    limiter = limits(per_minute=1, burst=2, concurrency=1)
+    lease = limiter.acquire_nowait("user:1")
+    for _ in range(3):
+        with pytest.raises(RateLimited, match="already have generations running"):
+            limiter.acquire_nowait("user:1")
+    lease.release()
+
+    # Only the first generation was charged, so the second token is still there
+    limiter.acquire_nowait("user:1").release()
+    with pytest.raises(RateLimited, match="Too many generations"):
+        limiter.acquire_nowait("user:1")
+
+
+def test_refused_rate_token_releases_the_slot(limits):
+    limiter = limits(per_minute=1, burst=1, concurrency=1)
+    limiter.acquire_nowait("user:1").release()
+    with pytest.raises(RateLimited, match="Too many generations"):
+        limiter.acquire_nowait("user:1")
+
+    # The slot taken for the refused generation was given back
+    assert limiter.backend.acquire_slot(f"{rate_limit.RATE_LIMIT_KEY_PREFIX}slots:user:1", 1, "probe", 60)
+
+
+def test_acquire_waits_for_a_running_generation(limits):
+    limiter = limits(per_minute=0, concurrency=1, queue_seconds=2)
+
+    async def scenario():
+        lease = await limiter.acquire("user:1")
+        asyncio.get_running_loop().call_later(0.05, lease.release)
+        return await limiter.acquire("user:1")
+
+    assert asyncio.run(scenario()) is not None
+
+
+def test_acquire_times_out_without_charging(limits):
+    limiter = limits(per_minute=1, burst=2, concurrency=1, queue_seconds=0.05)
+
+    async def scenario():
+        lease = await limiter.acquire("user:1")
+        with pytest.raises(RateLimited, match="already have generations running"):
+            await limiter.acquire("user:1")
+        lease.release()
+        return await limiter.acquire("user:1")
+
+    assert asyncio.run(scenario()) is not None
+
+
+def test_run_closes_a_rejected_generation(limits):
+    limiter = limits(per_minute=1, burst=1, concurrency=0)
+    ran = []
+
+    async def generation():
+        ran.append(True)
+        return "text"
+
+    assert asyncio.run(limiter.run("user:1", generation())) == "text"
+    rejected = generation()
+    with pytest.raises(RateLimited):
+        asyncio.run(limiter.run("user:1", rejected))
+    assert ran == [True]
+    assert rejected.cr_frame is None  # closed, so no "never awaited" warning
+
+
+def test_batch_takes_a_token_per_generation(limits):
+    limiter = limits(per_minute=1, burst=3, concurrency=0)
+
+    with pytest.raises(RateLimited, match="At most 3"):
+        limiter.acquire_batch_nowait("user:1", 4)
+    assert len(limiter.acquire_batch_nowait("user:1", 3)) == 3
+    with pytest.raises(RateLimited, match="Too many generations"):
+        limiter.acquire_batch_nowait("user:1", 1)
+
+
+def test_batch_gets_a_lease_per_free_slot(limits):
+    limiter = limits(per_minute=0, concurrency=2)
+    held = limiter.acquire_nowait("user:1")
+    leases = limiter.acquire_batch_nowait("user:1", 5)
+
+    assert len(leases) == 1
+    with pytest.raises(RateLimited, match="already have generations running"):
+        limiter.acquire_batch_nowait("user:1", 5)
+    for lease in leases + [held]:
+        lease.release()
+    assert len(limiter.acquire_batch_nowait("user:1", 5)) == 2
+
+
+def test_batch_refused_by_rate_releases_its_slots(limits):
+    limiter = limits(per_minute=1, burst=2, concurrency=2)
+    for lease in limiter.acquire_batch_nowait("user:1", 2):
+        lease.release()
+    with pytest.raises(RateLimited, match="Too many generations"):
+        limiter.acquire_batch_nowait("user:1", 2)
+
+    key = f"{rate_limit.RATE_LIMIT_KEY_PREFIX}slots:user:1"
+    assert limiter.backend.acquire_slot(key, 2, "a", 60) and limiter.backend.acquire_slot(key, 2, "b", 60)
+
+
+def test_expired_slots_are_reclaimed():
+    backend = LocalRateLimitBackend()
+    assert backend.acquire_slot("slots", 1, "stale", 0)
+    assert backend.acquire_slot("slots", 1, "fresh", 60)
+    assert not backend.acquire_slot("slots", 1, "third", 60)
@@ -0,0 +1,171 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import single_flight
+from single_flight import single_flight_middleware
+
+
+def make_generation(resume="resume text", stream=False, **inputs):
+    spec = SimpleNamespace(name="roast", version="1", model="fake", temperature=1.0)
+    return SimpleNamespace(spec=spec, resume_text=resume, inputs=inputs, stream=stream, asynchronous=False,
+                           options={})
+
+
+class FakeModel:
+    """call_next stand-in that counts calls and holds its output until released."""
+
+    def __init__(self, chunks=("one ", "two ", "three"), error=None):
+        self.chunks = chunks
+        self.error = error
+        self.calls = 0
+        self.closed = False
+        self.release = threading.Event()
+
+    def __call__(self, generation):
+        self.calls += 1
+        if generation.stream:
+            return self._stream()
+        self.release.wait(5)
+        return "".join(self.chunks)
+
+    def _stream(self):
+        try:
+            self.release.wait(5)
+            for chunk in self.chunks:
+                yield chunk
+            if self.error is not None:
+                raise self.error
+        finally:
+            self.closed = True
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def run_readers(count, target):
+    results = [None] * count
+    errors = [None] * count
+
+    def read(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=read, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def stream_readers(key):
+    shared = single_flight._streams.get(key)
+    return shared.readers if shared else 0
+
+
+@pytest.mark.parametrize("count", [2, 5])
+def test_concurrent_identical_streams_make_one_model_call(count):
+    model = FakeModel()
+    generation = make_generation(stream=True)
+    key = single_flight.response_key(generation)
+
+    threads, results, errors = run_readers(
+        count, lambda: list(single_flight_middleware(make_generation(stream=True), model)))
+    wait_for(lambda: stream_readers(key) == count)
+    model.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert model.calls == 1
+    assert errors == [None] * count
+    assert results == [list(model.chunks)] * count
+    assert key not in single_flight._streams
+
+
+def test_stream_joining_late_replays_from_the_start():
+    model = FakeModel()
+    first = single_flight_middleware(make_generation(stream=True), model)
+    model.release.set()
+    assert next(first) == "one "
+
+    second = single_flight_middleware(make_generation(stream=True), model)
+    assert list(second) == ["one ", "two ", "three"]
+    assert list(first) == ["two ", "three"]
+    assert model.calls == 1
+
+
+def test_stream_continues_when_the_first_reader_leaves():
+    model = FakeModel()
+    model.release.set()
+    first = single_flight_middleware(make_generation(stream=True), model)
+    second = single_flight_middleware(make_generation(stream=True), model)
+
+    assert next(first) == "one "
+    assert next(second) == "one "
+    first.close()
+
+    assert list(second) == ["two ", "three"]
+    assert model.calls == 1
+
+
+def test_stream_abandoned_by_every_reader_closes_the_model_stream():
+    model = FakeModel()
+    model.release.set()
+    key = single_flight.response_key(make_generation(stream=True))
+    reader = single_flight_middleware(make_generation(stream=True), model)
+
+    assert next(reader) == "one "
+    reader.close()
+
+    assert model.closed
+    assert key not in single_flight._streams
+    # The next identical stream starts over
+    assert list(single_flight_middleware(make_generation(stream=True), model)) == ["one ", "two ", "three"]
+    assert model.calls == 2
+
+
+def test_stream_error_reaches_every_reader():
+    model = FakeModel(error=RuntimeError("model failed"))
+    threads, results, errors = run_readers(
+        3, lambda: list(single_flight_middleware(make_generation(stream=True), model)))
+    wait_for(lambda: stream_readers(single_flight.response_key(make_generation(stream=True))) == 3)
+    model.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert model.calls == 1
+    assert all(isinstance(e, RuntimeError) for e in errors)
+
+
+def test_different_streams_are_not_coalesced():
+    model = FakeModel()
+    model.release.set()
+    first = single_flight_middleware(make_generation("resume a", stream=True), model)
+    second = single_flight_middleware(make_generation("resume b", stream=True), model)
+
+    assert list(first) == list(second) == ["one ", "two ", "three"]
+    assert model.calls == 2
+
+
+def test_concurrent_identical_generations_make_one_model_call():
+    model = FakeModel()
+    key = single_flight.response_key(make_generation())
+
+    threads, results, errors = run_readers(4, lambda: single_flight_middleware(make_generation(), model))
+    wait_for(lambda: key in single_flight._inflight)
+    # Followers are waiting on the leader's future by the time it is released
+    time.sleep(0.1)
+    model.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert model.calls == 1
+    assert results == ["one two three"] * 4
+    assert key not in single_flight._inflight
@@ -0,0 +1,112 @@
+import unicodedata
+
+import pytest
+
+from text_extraction import fold_to_ascii, parse_sections, strip_running_lines, _fold_run
+
+
+@pytest.mark.parametrize("text, folded", [
+    ("José Müller", "Jose Muller"),
+    ("naïve café", "naive cafe"),
+    ("Straße Øresund", "Strasse Oresund"),
+    ("Ĳ æ Œ þ", "IJ ae OE th"),
+    ("“quoted” — ‘x’ – • item…", "\"quoted\" - 'x' - - item..."),
+    ("ﬁnance ＡＢＣ１２３", "finance ABC123"),
+    ("½ cup", "1/2 cup"),
+    ("x y", "x y"),
+    ("Python 🐍 rocks", "Python   rocks"),
+    ("Иван Go", "  Go"),
+    ("plain ASCII stays as is", "plain ASCII stays as is"),
+])
+def test_fold_to_ascii(text, folded):
+    assert fold_to_ascii(text) == folded
+
+
+def test_fold_to_ascii_matches_the_python_fold():
+    # Every BMP character folds as decomposing the whole text and folding it in Python would,
+    # except that the C path may split a run of unencodable characters into several spaces
+    text = "".join(chr(code) for code in range(0xa0, 0x3000) if not 0xd800 <= code < 0xe000)
+    folded = fold_to_ascii(text)
+
+    assert folded.isascii()
+    assert folded.split() == _fold_run(unicodedata.normalize("NFKD", text)).split()
+
+
+def pages_of(*bodies):
+    return [f"Jane Doe\nSenior Engineer\n{body}\nJane Doe\nPage {i} of {len(bodies)}"
+            for i, body in enumerate(bodies, 1)]
+
+
+def test_running_lines_are_kept_on_the_first_page_only():
+    pages = pages_of("first a\nfirst b", "second a\nsecond b", "third a\nthird b")
+
+    assert strip_running_lines(pages) == [pages[0], "second a\nsecond b", "third a\nthird b"]
+
+
+def test_running_lines_inside_a_page_are_kept():
+    pages = pages_of("intro", "Jane Doe\nreferences Jane Doe's work")
+
+    assert strip_running_lines(pages)[1] == "Jane Doe\nreferences Jane Doe's work"
+
+
+def test_lines_on_few_pages_are_kept():
+    pages = ["Jane Doe\nA", "Jane Doe\nB", "Other\nC", "Another\nD"]
+
+    assert strip_running_lines(pages) == pages
+
+
+def test_short_pages_and_surrounding_whitespace():
+    assert strip_running_lines(["  Jane Doe\nA\n", "Jane Doe\nB"]) == ["Jane Doe\nA", "B"]
+
+
+def test_single_page_is_untouched():
+    assert strip_running_lines(["Jane Doe\nPage 1 of 1"]) == ["Jane Doe\nPage 1 of 1"]
+
+
+RESUME = """Jane Doe
+jane.doe@example.com | +1 555 010 0000 | linkedin.com/in/janedoe
+Open to work 2019 - 2023
+Professional Summary
+Engineer with skills in Python.
+WORK EXPERIENCE
+Senior Engineer, 2019 - 2023
+Technical Skills
+Languages: Python, Go; SQL
+Tools: Docker | Kubernetes
+Education
+BSc Computer Science
+Skills: Python, Rust
+Awards"""
+
+
+def test_parse_sections_without_heading_styles():
+    parsed = parse_sections(RESUME)
+
+    assert parsed["sections"] == {
+        "header": "Jane Doe\njane.doe@example.com | +1 555 010 0000 | linkedin.com/in/janedoe\nOpen to work 2019 - 2023",
+        "summary": "Engineer with skills in Python.",
+        "experience": "Senior Engineer, 2019 - 2023",
+        # A section named twice is joined; an empty one is dropped
+        "skills": "Languages: Python, Go; SQL\nTools: Docker | Kubernetes\nPython, Rust",
+        "education": "BSc Computer Science",
+    }
+    # The date range is too short to be a phone number
+    assert parsed["contact"] == {"emails": ["jane.doe@example.com"], "phones": ["+1 555 010 0000"],
+                                 "links": ["linkedin.com/in/janedoe"]}
+    assert parsed["skills"] == ["Python", "Go", "SQL", "Docker", "Kubernetes", "Rust"]
+
+
+def test_parse_sections_with_heading_styles():
+    parsed = parse_sections(RESUME, headings=["Professional Summary", "Technical Skills"])
+
+    # Unstyled headings only count in capitals or with inline text after a colon
+    assert list(parsed["sections"]) == ["header", "summary", "experience", "skills"]
+    assert parsed["sections"]["skills"].endswith("Education\nBSc Computer Science\nPython, Rust\nAwards")
+
+
+def test_parse_sections_without_headings():
+    assert parse_sections("Jane Doe\nsome text") == {
+        "sections": {"header": "Jane Doe\nsome text"},
+        "contact": {"emails": [], "phones": [], "links": []},
+        "skills": [],
+    }
@@ -1,45 +1,379 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import codecs
+import functools
+import multiprocessing
+import os
+import threading
+import unicodedata
 import docx
 import fitz
 import re
 
+from metrics import span
 
-async def get_pdf_text(file_stream):
-    """Extract text from a PDF file."""
-    doc = fitz.open("pdf", file_stream.read())
-    text = ""
-    for page in doc:
-        text += page.get_text()
+# PDFs with more pages than this are split into page ranges parsed in parallel
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", str(min(os.cpu_count() or 1, 4))))
 
-    return text
+# Bump whenever preprocess_text or parse_sections changes so cached extractions are not reused
+PREPROCESS_VERSION = "4"
 
+# Separates pages in extracted PDF text so running headers and footers can be found
+PAGE_BREAK = "\f"
 
-async def get_docx_text(file_stream):
-    """Extract text from a DOCX file."""
+# Section headings are short; a PDF line counts as heading-styled if bold or this much larger than body text
+HEADING_MAX_CHARS = 60
+HEADING_MIN_SIZE_DELTA = 1.5
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn rather than fork: the web process already runs background threads
+            _executor = ProcessPoolExecutor(max_workers=PDF_EXTRACTION_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def _open_pdf(source):
+    """Open a PDF from raw bytes or a filesystem path."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return fitz.open("pdf", source)
+    return fitz.open(source)
+
+
+def _page_headings(page):
+    """Lines of a page set in heading style: noticeably larger than the body text, or entirely bold."""
+    lines = []
+    sizes = Counter()
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", ()):
+            spans = [text_span for text_span in line["spans"] if text_span["text"].strip()]
+            if not spans:
+                continue
+            for text_span in spans:
+                sizes[round(text_span["size"])] += len(text_span["text"])
+            bold = all(text_span["flags"] & 16 or "bold" in text_span["font"].lower() for text_span in spans)
+            lines.append(("".join(text_span["text"] for text_span in spans).strip(),
+                          max(text_span["size"] for text_span in spans), bold))
+
+    if not sizes:
+        return []
+    body_size = sizes.most_common(1)[0][0]
+    return [text for text, size, bold in lines
+            if len(text) <= HEADING_MAX_CHARS and (bold or size >= body_size + HEADING_MIN_SIZE_DELTA)]
+
+
+def _extract_page_range(source, start, stop, headings=False):
+    """Process pool task: return (text, heading lines) for pages [start, stop)."""
+    with _open_pdf(source) as doc:
+        return [(doc[number].get_text(), _page_headings(doc[number]) if headings else [])
+                for number in range(start, stop)]
+
+
+def extract_pdf(source, headings=True):
+    """Extract the text and heading-style lines of a PDF given as bytes or a path.
+
+    Large documents are fanned out to worker processes in page ranges.
+    """
+    with _open_pdf(source) as doc:
+        page_count = doc.page_count
+        if page_count <= PDF_PAGES_PER_TASK or PDF_EXTRACTION_WORKERS <= 1:
+            pages = _extract_page_range(source, 0, page_count, headings) if headings else \
+                [(page.get_text(), []) for page in doc]
+        else:
+            pages = None
+
+    if pages is None:
+        executor = _get_executor()
+        futures = [executor.submit(_extract_page_range, source, start,
+                                   min(start + PDF_PAGES_PER_TASK, page_count), headings)
+                   for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+        pages = [page for future in futures for page in future.result()]
+
+    return PAGE_BREAK.join(text for text, _ in pages), [line for _, lines in pages for line in lines]
+
+
+def extract_pdf_text(source):
+    """Extract text from a PDF given as bytes or a path."""
+    return extract_pdf(source, headings=False)[0]
+
+
+def extract_docx(file_stream):
+    """Extract the text and heading-style paragraphs (Heading/Title styles or all bold) of a DOCX file or path."""
     doc = docx.Document(file_stream)
-    text = ""
+    headings = []
     for para in doc.paragraphs:
-        text += para.text + "\n"
+        text = para.text.strip()
+        if not text or len(text) > HEADING_MAX_CHARS:
+            continue
+        runs = [run for run in para.runs if run.text.strip()]
+        if para.style.name.lower().startswith(("heading", "title")) or (runs and all(run.bold for run in runs)):
+            headings.append(text)
+    return "".join(para.text + "\n" for para in doc.paragraphs), headings
+
+
+def extract_docx_text(file_stream):
+    """Extract text from a DOCX file object or path."""
+    return extract_docx(file_stream)[0]
+
+
+async def get_pdf_content(source):
+    """Extract (text, heading lines) from a PDF file object or path without blocking the event loop."""
+    if hasattr(source, "read"):
+        source = source.read()
+    with span("extraction", "pdf"):
+        return await asyncio.to_thread(extract_pdf, source)
+
+
+async def get_docx_content(file_stream):
+    """Extract (text, heading lines) from a DOCX file without blocking the event loop."""
+    with span("extraction", "docx"):
+        return await asyncio.to_thread(extract_docx, file_stream)
+
+
+# Punctuation and letters that NFKD leaves alone (or decomposes badly) but have an obvious ASCII equivalent
+_ASCII_TABLE = str.maketrans({
+    "\u2018": "'", "\u2019": "'", "\u201a": "'", "\u201b": "'", "\u2032": "'",
+    "\u201c": '"', "\u201d": '"', "\u201e": '"', "\u201f": '"',
+    "\u2010": "-", "\u2011": "-", "\u2012": "-", "\u2013": "-", "\u2014": "-", "\u2015": "-", "\u2212": "-",
+    "\u2022": "-", "\u2023": "-", "\u2043": "-", "\u25aa": "-", "\u25cf": "-", "\u25e6": "-", "\u27a2": "-",
+    "\uf0a7": "-", "\uf0b7": "-",
+    "\u2044": "/", "\u00b7": "-", "\u00d7": "x",
+    "\u00df": "ss", "\u1e9e": "SS", "\u00f8": "o", "\u00d8": "O", "\u0142": "l", "\u0141": "L",
+    "\u00e6": "ae", "\u00c6": "AE", "\u0153": "oe", "\u0152": "OE", "\u0111": "d", "\u0110": "D",
+    "\u00f0": "d", "\u00d0": "D", "\u00fe": "th", "\u00de": "Th", "\u0131": "i", "\u0127": "h", "\u0126": "H",
+})
+
+# The table as a charmap codec so folding runs in C. Characters it maps to a single ASCII
+# character, then as many of the accents NFKD splits off (combining marks) as fit, encode to
+# the byte values above ASCII; those bytes are then translated or deleted. Everything else
+# goes to _fold_error.
+_CHARMAP_CHARS = ([chr(code) for code, folded in _ASCII_TABLE.items() if len(folded) == 1] +
+                  [chr(code) for code in range(0x300, 0x370)])[:128]
+_CHARMAP = codecs.charmap_build("".join(map(chr, range(128))) + "".join(_CHARMAP_CHARS).ljust(128, "\ufffe"))
+_CHARMAP_BYTES = (bytes(range(128)) + bytes(ord(_ASCII_TABLE.get(ord(char), "\0")) for char in _CHARMAP_CHARS)
+                  ).ljust(256, b"\0")
+_CHARMAP_DELETE = bytes(128 + i for i, char in enumerate(_CHARMAP_CHARS) if ord(char) not in _ASCII_TABLE)
+
+_NON_ASCII = re.compile(r"[^\x00-\x7f]+")
+_COMBINING = re.compile(r"[\u0300-\u036f]+")
+
+_DIGITS = re.compile(r"\d+")
+_SPACES = re.compile(r"  +")
+_BLANK_LINES = re.compile(r"\n\n\n+")
+
+# How many lines at the top and bottom of a page count as header/footer
+RUNNING_LINE_DEPTH = 2
+
+
+@functools.lru_cache(maxsize=4096)
+def _fold_run(run):
+    run = unicodedata.normalize("NFKD", run.translate(_ASCII_TABLE))
+    if run.isascii():
+        return run
+    return _NON_ASCII.sub(" ", _COMBINING.sub("", run))
 
-    return text
 
+def _fold_error(error):
+    # Encoding error handler: called once per run of characters the charmap can't encode
+    return _fold_run(error.object[error.start:error.end]), error.end
 
-def remove_special_characters(text):
-    """Remove special characters and emojis from text."""
-    emoji_pattern = re.compile("["
-                               u"\U0001F600-\U0001F64F"  # emoticons
-                               u"\U0001F300-\U0001F5FF"  # symbols & pictographs
-                               u"\U0001F680-\U0001F6FF"  # transport & map symbols
-                               u"\U0001F1E0-\U0001F1FF"  # flags (iOS)
-                               u"\U00002702-\U000027B0"  # Dingbats
-                               u"\U000024C2-\U0001F251"
-                               "]+", flags=re.UNICODE)
-    text = emoji_pattern.sub(r'', text)
-    text = re.sub(r'[^\x00-\x7F]+', ' ', text)
-    return text
+
+codecs.register_error("cvmaster_fold", _fold_error)
+
+
+def fold_to_ascii(text):
+    """Fold text to ASCII: accents are dropped (é becomes e, not a space), ligatures and
+    full-width forms decomposed, typographic punctuation and letters such as ß or ø mapped,
+    and anything else (emoji, non-Latin scripts) replaced by a space.
+
+    The text is decomposed, encoded and translated in C; only the rare characters the
+    charmap can't encode are folded in Python, each distinct run once.
+    """
+    if text.isascii():
+        return text
+    data, _ = codecs.charmap_encode(unicodedata.normalize("NFKD", text), "cvmaster_fold", _CHARMAP)
+    return data.translate(_CHARMAP_BYTES, _CHARMAP_DELETE).decode("ascii")
+
+
+def _split_edges(page):
+    """Split a page into its first lines, the text between and its last lines (up to RUNNING_LINE_DEPTH
+    each), without splitting all of it. The middle is empty when every line is an edge line."""
+    head = page.split("\n", RUNNING_LINE_DEPTH)
+    if len(head) <= RUNNING_LINE_DEPTH:
+        return head, [], []
+    tail = head.pop().rsplit("\n", RUNNING_LINE_DEPTH)
+    middle = tail[:1] if len(tail) > RUNNING_LINE_DEPTH else []
+    return head, middle, tail[len(middle):]
+
+
+def _count_keys(keys):
+    # Pages a key appears on
+    return Counter([key for page_keys in keys for key in set(page_keys)])
+
+
+def strip_running_lines(pages):
+    """Drop header/footer lines repeated on most pages, such as the candidate's name or "Page 2 of 3".
+
+    The first occurrence of each is kept, so the name heading page 1 stays in the text.
+    """
+    if len(pages) < 2:
+        return pages
+
+    pages = [page.strip() for page in pages]
+    edges = [_split_edges(page) for page in pages]
+    keys = [[line.strip().lower() for line in head + tail] for head, _, tail in edges]
+    threshold = max(2, len(pages) // 2 + 1)
+    counts = _count_keys(keys)
+    # Page numbers differ from page to page, so lines not repeated verbatim are compared with digits masked
+    masked = {key: _DIGITS.sub("#", key) for key, count in counts.items() if count < threshold}
+    if masked:
+        keys = [[masked.get(key, key) for key in page_keys] for page_keys in keys]
+        counts = _count_keys(keys)
+    repeated = {key for key, count in counts.items() if count >= threshold and key}
+    if not repeated:
+        return pages
+
+    stripped, seen = [], set()
+    for page, (head, middle, tail), page_keys in zip(pages, edges, keys):
+        if any(key in seen for key in page_keys):
+            head_keys, tail_keys = page_keys[:len(head)], page_keys[len(head):]
+            page = "\n".join([line for line, key in zip(head, head_keys) if key not in seen] + middle +
+                              [line for line, key in zip(tail, tail_keys) if key not in seen])
+        seen.update(key for key in page_keys if key in repeated)
+        stripped.append(page)
+    return stripped
+
+
+def collapse_whitespace(text):
+    """Collapse runs of spaces within lines, trim every line and allow at most one blank line in a row."""
+    for char in "\t\r\v\f":
+        if char in text:
+            text = text.replace(char, " ")
+    text = _SPACES.sub(" ", text).replace(" \n", "\n").replace("\n ", "\n").strip(" ")
+    return _BLANK_LINES.sub("\n\n", text)
 
 
 def preprocess_text(text):
-    """Preprocess text by removing special characters and organizing it into sections."""
-    text = remove_special_characters(text)
+    """Normalize extracted text: fold to ASCII, drop running headers/footers and collapse whitespace."""
+    text = fold_to_ascii(text)
+    text = "\n".join(strip_running_lines(text.split(PAGE_BREAK)))
+    return collapse_whitespace(text).strip()
+
+
+# Canonical resume sections and the headings that introduce them
+SECTION_HEADINGS = {
+    "summary": ("summary", "professional summary", "profile", "professional profile", "objective",
+                "career objective", "about me"),
+    "experience": ("experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "internships", "internship", "internship experience"),
+    "education": ("education", "academic background", "academics", "academic qualifications",
+                  "educational qualifications"),
+    "projects": ("projects", "personal projects", "academic projects", "key projects", "selected projects"),
+    "skills": ("skills", "technical skills", "key skills", "core skills", "core competencies", "skills and tools",
+               "technologies", "tech stack", "technical proficiency"),
+    "certifications": ("certifications", "certificates", "licenses and certifications", "courses",
+                       "certifications and courses", "relevant coursework", "coursework"),
+    "achievements": ("achievements", "awards", "honors", "honors and awards", "awards and achievements",
+                     "accomplishments"),
+    "extracurricular": ("extracurricular", "extracurricular activities", "extra curricular activities",
+                        "activities", "leadership", "leadership experience", "volunteering", "volunteer experience",
+                        "positions of responsibility"),
+    "publications": ("publications", "research", "research experience"),
+}
+
+_SECTION_BY_HEADING = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
+
+_HEADING_NOISE = re.compile(r"[^a-z ]+")
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_PHONE = re.compile(r"\+?\d[\d ()-]{7,}\d")
+_LINK = re.compile(r"(?:https?://)?(?:www\.)?(?:linkedin\.com|github\.com|gitlab\.com)/[\w/.-]+|https?://\S+",
+                   re.IGNORECASE)
+_SKILL_SEPARATORS = re.compile(r"[,;|\n]|\s-\s|^- ", re.MULTILINE)
+
+SKILL_MAX_CHARS = 40
+# Fewer digits than this is more likely a date range than a phone number
+PHONE_MIN_DIGITS = 9
+
+
+def _heading_key(line):
+    text = fold_to_ascii(line).lower().replace("&", " and ")
+    return " ".join(_HEADING_NOISE.sub(" ", text).split())
+
+
+def _split_heading(line, styled):
+    """Return (section, rest of line) if a line opens a section, else None.
+
+    With heading styles available a known heading only counts when styled (or in
+    capitals), so the word "Skills" inside a sentence never splits a section. An
+    inline "Skills: Python, SQL" is recognised either way.
+    """
+    head, colon, rest = line.partition(":")
+    section = _SECTION_BY_HEADING.get(_heading_key(head))
+    if section is None:
+        return None
+    if colon and rest.strip():
+        return section, rest.strip()
+    if not styled or _heading_key(line) in styled or line.strip().isupper():
+        return section, ""
+    return None
+
+
+def _contact(text):
+    return {
+        "emails": list(dict.fromkeys(_EMAIL.findall(text))),
+        "phones": list(dict.fromkeys(match.strip() for match in _PHONE.findall(text)
+                                     if sum(c.isdigit() for c in match) >= PHONE_MIN_DIGITS)),
+        "links": list(dict.fromkeys(_LINK.findall(text))),
+    }
+
+
+def _skill_list(text):
+    skills = []
+    for line in text.split("\n"):
+        # "Languages: Python, Go" lists skills after a category label
+        line = line.partition(":")[2] if ":" in line else line
+        for item in _SKILL_SEPARATORS.split(line):
+            item = item.strip(" -.")
+            if item and len(item) <= SKILL_MAX_CHARS and item not in skills:
+                skills.append(item)
+    return skills
+
+
+def parse_sections(text, headings=None):
+    """Split preprocessed resume text into canonical sections and pull out contact details and skills.
+
+    `headings` are the heading-styled lines reported by extract_pdf/extract_docx.
+    Text before the first recognised heading is kept as "header". Returns a
+    JSON-serialisable dict with "sections", "contact" and "skills".
+    """
+    styled = {_heading_key(line) for line in headings or ()}
+    styled &= _SECTION_BY_HEADING.keys()
+
+    sections = {}
+    current, lines = "header", []
+    for line in text.split("\n"):
+        split = _split_heading(line, styled)
+        if split is None:
+            lines.append(line)
+            continue
+        if lines:
+            sections[current] = (sections.get(current, "") + "\n" + "\n".join(lines)).strip()
+        current, rest = split
+        lines = [rest] if rest else []
+    if lines:
+        sections[current] = (sections.get(current, "") + "\n" + "\n".join(lines)).strip()
 
-    return text.strip()
+    sections = {name: body for name, body in sections.items() if body}
+    return {
+        "sections": sections,
+        "contact": _contact(sections.get("header", text)),
+        "skills": _skill_list(sections.get("skills", "")),
+    }
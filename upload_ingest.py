@@ -0,0 +1,91 @@
+import hashlib
+import os
+import tempfile
+
+from dotenv import load_dotenv
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+load_dotenv()
+
+# Largest resume accepted; checked against Content-Length and again while the body is read
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class UploadSpool:
+    """Temporary file that hashes and size-checks an upload as it is written.
+
+    The multipart parser writes file parts straight into it, so the upload is never
+    held in memory; once received, `path` can be handed to the extractor and the
+    blob store without another copy.
+    """
+
+    def __init__(self, max_bytes=MAX_UPLOAD_BYTES, dir=UPLOAD_SPOOL_DIR):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._file = tempfile.NamedTemporaryFile(prefix="upload-", dir=dir)
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise RequestEntityTooLarge()
+        self._hash.update(data)
+        return self._file.write(data)
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    @property
+    def path(self):
+        self._file.flush()
+        return self._file.name
+
+    def __getattr__(self, name):
+        # read/seek/tell/close etc. go to the underlying file
+        return getattr(self._file, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # Closing a NamedTemporaryFile also removes it
+        self._file.close()
+
+
+class SpoolingRequest(Request):
+    """Request class that receives uploaded files into UploadSpools.
+
+    Pair it with MAX_CONTENT_LENGTH so oversized bodies are rejected from their
+    Content-Length before anything is read.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadSpool()
+
+
+def spool_upload(file):
+    """Return the UploadSpool behind a FileStorage, spooling it in chunks if it was received some other way."""
+    if isinstance(file.stream, UploadSpool):
+        file.stream.seek(0)
+        return file.stream
+
+    spool = UploadSpool()
+    try:
+        while True:
+            chunk = file.stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool